@@ -0,0 +1,308 @@
+"""
+Benchmark suite.
+
+Runs deterministic seeded scenarios and measures maze generation (Maze.generate, Maze.create_paths),
+path estimation (optimalPathEstimate), single team turns and full games.
+Results (ops/sec, per-turn latency percentiles, peak memory) are printed and can be written as JSON
+and compared against a previously saved baseline:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from src.game import Game
+from src.maze import Maze
+from src.generators import GENERATORS
+from src.objects import ITEM
+from src.run_modes import derive_seed
+from src.team import DecisionPool
+from util.consts import GENERATOR, DECISIONS
+from util.helpers import optimalPathEstimate
+
+# name, maze width, maze height, item count, robot count (both teams together)
+SCENARIOS = {
+    "quick": [
+        ("default", 35, 23, 6, 6),
+        ("crowded", 35, 23, 100, 100),
+        ("medium", 100, 100, 50, 50),
+    ],
+}
+SCENARIOS["full"] = SCENARIOS["quick"] + [
+    ("large", 500, 500, 200, 200),
+    ("huge", 2000, 2000, 1000, 1000),
+]
+BENCHMARKS = ["generate", "create_paths", "path_estimate", "team_turn", "game"]
+
+
+def percentiles(samples: list) -> dict:
+    """
+    Returns latency statistics of the samples (in seconds)
+    """
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    def rank(q):
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+    return {"p50": rank(0.5), "p90": rank(0.9), "p99": rank(0.99), "max": samples[-1], "mean": sum(samples) / len(samples)}
+
+def peak_memory() -> int:
+    """
+    Returns the peak resident memory of this process in bytes (None where the resource module is missing)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def repeat(function, min_time: float, max_runs: int) -> tuple:
+    """
+    Calls function(run) for run = 0, 1, ... until min_time seconds passed or max_runs calls were made (at least once)
+    Returns the list of durations of the calls
+    """
+    durations = []
+    total = 0
+    while not durations or (total < min_time and len(durations) < max_runs):
+        start = time.perf_counter()
+        function(len(durations))
+        durations.append(time.perf_counter() - start)
+        total += durations[-1]
+    return durations
+
+def unwalled_maze(x: int, y: int, itemCount: int, robotCount: int, seed: int) -> Maze:
+    """
+    Returns a maze with items, robots and delivery points placed like Maze.generate does, but without walls
+    """
+    generated = Maze(x, y)
+    generated.generate(itemCount=itemCount, robotCount=robotCount // 2, rng=random.Random(seed))
+    maze = Maze(x, y)
+    for ix, iy in generated.maze.positions(ITEM):
+        maze.set(ix, iy, ITEM)
+    maze.itemCount = itemCount
+    maze.deliveryPoints = list(generated.deliveryPoints)
+    for robot in generated.robots:
+        maze.add_robot(type(robot)(robot.x, robot.y))
+    return maze
+
+def bench_generate(scenario: tuple, seed: int, options) -> dict:
+    name, x, y, itemCount, robotCount = scenario
+    def run(i):
+        Maze(x, y).generate(itemCount=itemCount, robotCount=robotCount // 2, rng=random.Random(derive_seed(seed, i)), generator=options.generator)
+    durations = repeat(run, options.min_time, options.max_runs)
+    result = {"runs": len(durations), "ops_per_sec": len(durations) / sum(durations), "latency": percentiles(durations)}
+    return result
+
+def bench_create_paths(scenario: tuple, seed: int, options) -> dict:
+    name, x, y, itemCount, robotCount = scenario
+    maze = unwalled_maze(x, y, itemCount, robotCount, seed)
+    unwalled = bytes(maze.maze.cells)
+    def run(i):
+        # paths are carved in place
+        maze.maze.cells[:] = unwalled
+        maze.create_paths(random.Random(derive_seed(seed, i)))
+    durations = repeat(run, options.min_time, options.max_runs)
+    result = {"runs": len(durations), "ops_per_sec": len(durations) / sum(durations), "latency": percentiles(durations)}
+    return result
+
+def bench_path_estimate(scenario: tuple, seed: int, options) -> dict:
+    """
+    optimalPathEstimate on the cooperative memory after a few turns (so it is partly explored),
+    from seeded random passable cells to the items and the delivery point
+    """
+    name, x, y, itemCount, robotCount = scenario
+    game = Game(random.Random(seed), x, y, itemCount, robotCount, options.generator)
+    for _ in range(options.warmup_turns):
+        if game.finished():
+            break
+        game.turn()
+    memory = game.team1.memory
+    rng = random.Random(seed)
+    targets = list(game.maze.maze.positions(ITEM)) + [game.maze.deliveryPoints[0]]
+    starts = [(robot.x, robot.y) for robot in game.team1.members]
+    queries = [(rng.choice(starts), rng.choice(targets)) for _ in range(64)]
+    def run(i):
+        (sx, sy), (tx, ty) = queries[i % len(queries)]
+        optimalPathEstimate(memory, sx, sy, tx, ty)
+    durations = repeat(run, options.min_time, options.max_runs * 10)
+    result = {"runs": len(durations), "ops_per_sec": len(durations) / sum(durations), "latency": percentiles(durations)}
+    return result
+
+def decision_pool(options) -> DecisionPool:
+    """
+    Returns the pool deciding simultaneous team turns of the game benchmarks, None without --decision-workers
+    """
+    return DecisionPool(options.decision_workers) if options.decision_workers else None
+
+def bench_team_turn(scenario: tuple, seed: int, options) -> dict:
+    """
+    Latency of team.turn() of both teams, up to max_turns turns of one game
+    """
+    name, x, y, itemCount, robotCount = scenario
+    pool = decision_pool(options)
+    def play(samples1, samples2):
+        game = Game(random.Random(seed), x, y, itemCount, robotCount, options.generator, decisions=options.decisions, pool=pool)
+        while not game.finished() and game.turns < options.max_turns:
+            game.turns += 1
+            start = time.perf_counter()
+            game.team1.turn()
+            middle = time.perf_counter()
+            game.team2.turn()
+            samples1.append(middle - start)
+            samples2.append(time.perf_counter() - middle)
+        return game
+    cooperative, self_interested = [], []
+    game = play(cooperative, self_interested)
+    if pool is not None:
+        pool.close()
+    result = {
+        "turns": game.turns,
+        "cooperative": {"ops_per_sec": len(cooperative) / sum(cooperative), "latency": percentiles(cooperative)},
+        "self_interested": {"ops_per_sec": len(self_interested) / sum(self_interested), "latency": percentiles(self_interested)},
+        "scores": [game.team1.getScore(), game.team2.getScore()],
+    }
+    result["ops_per_sec"] = len(cooperative) / (sum(cooperative) + sum(self_interested))
+    return result
+
+def bench_game(scenario: tuple, seed: int, options) -> dict:
+    """
+    Full games (generation included) with seeds derived like team_winrate does, turn latency is Game.turn()
+    """
+    name, x, y, itemCount, robotCount = scenario
+    pool = decision_pool(options)
+    def play(i, samples):
+        game = Game(random.Random(derive_seed(seed, i)), x, y, itemCount, robotCount, options.generator, decisions=options.decisions, pool=pool)
+        while not game.finished() and game.turns < options.max_turns:
+            start = time.perf_counter()
+            game.turn()
+            samples.append(time.perf_counter() - start)
+        return game
+    turns = []
+    games = []
+    start = time.perf_counter()
+    for i in range(options.games):
+        games.append(play(i, turns))
+    wall = time.perf_counter() - start
+    if pool is not None:
+        pool.close()
+    result = {
+        "games": options.games,
+        "finished": sum(game.finished() for game in games),
+        "turns": sum(game.turns for game in games),
+        "scores": [sum(game.team1.getScore() for game in games), sum(game.team2.getScore() for game in games)],
+        "wall_time": wall,
+        "ops_per_sec": options.games / wall,
+        "turns_per_sec": len(turns) / sum(turns) if turns else 0,
+        "latency": percentiles(turns),
+    }
+    return result
+
+def run_benchmark(benchmark: str, scenario: tuple, options) -> dict:
+    """
+    Runs one benchmark, it is called in a fresh worker process so that peak memory and caches belong to it alone
+    """
+    result = globals()["bench_" + benchmark](scenario, options.seed, options)
+    result["peak_memory"] = peak_memory()
+    return result
+
+def run_suite(options) -> dict:
+    """
+    Runs the selected benchmarks of the selected scenarios and returns the report
+    """
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "preset": options.preset,
+            "seed": options.seed,
+            "max_turns": options.max_turns,
+            "games": options.games,
+            "generator": options.generator,
+            "decisions": options.decisions,
+            "decision_workers": options.decision_workers,
+        },
+        "results": {},
+    }
+    for scenario in SCENARIOS[options.preset]:
+        if options.scenario and scenario[0] not in options.scenario:
+            continue
+        for benchmark in BENCHMARKS:
+            if options.benchmark and benchmark not in options.benchmark:
+                continue
+            key = scenario[0] + "/" + benchmark
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(run_benchmark, benchmark, scenario, options).result()
+            result["scenario"] = {"x": scenario[1], "y": scenario[2], "items": scenario[3], "robots": scenario[4]}
+            report["results"][key] = result
+            print(f"{key:28} {result['ops_per_sec']:12.2f} ops/s {(result['peak_memory'] or 0) / 2**20:10.1f} MiB", flush=True)
+    return report
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """
+    Prints the change of every result against the baseline and returns the keys of the regressed ones
+    A result regressed if its ops/sec dropped or its median latency grew by more than threshold (0.1 = 10 %)
+    Results that ended with different turns or scores than the baseline are reported too (the game behaves differently)
+    """
+    regressions = []
+    for key, result in report["results"].items():
+        old = baseline.get("results", {}).get(key)
+        if old is None:
+            print(f"{key:28} no baseline")
+            continue
+        speedup = result["ops_per_sec"] / old["ops_per_sec"]
+        line = f"{key:28} {speedup:6.2f}x ops/s"
+        regressed = speedup < 1 - threshold
+        if "p50" in result.get("latency", {}) and "p50" in old.get("latency", {}):
+            ratio = result["latency"]["p50"] / old["latency"]["p50"] if old["latency"]["p50"] else 1
+            line += f" {ratio:6.2f}x p50"
+            regressed = regressed or ratio > 1 + threshold
+        if "peak_memory" in result and old.get("peak_memory"):
+            line += f" {result['peak_memory'] / old['peak_memory']:6.2f}x memory"
+        if (result.get("turns"), result.get("scores")) != (old.get("turns"), old.get("scores")):
+            line += " (different game results)"
+        if regressed:
+            line += " REGRESSION"
+            regressions.append(key)
+        print(line)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the maze simulation")
+    parser.add_argument("--preset", choices=sorted(SCENARIOS), default="quick", help="scenario set, full goes up to 2000x2000 mazes with 1000 robots and items")
+    parser.add_argument("--scenario", action="append", help="run only this scenario (can be repeated)")
+    parser.add_argument("--benchmark", action="append", choices=BENCHMARKS, help="run only this benchmark (can be repeated)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the scenarios")
+    parser.add_argument("--generator", choices=sorted(GENERATORS), default=GENERATOR, help="maze generator of the scenarios")
+    parser.add_argument("--decisions", choices=["sequential", "simultaneous"], default=DECISIONS, help="team turns of the team_turn and game benchmarks")
+    parser.add_argument("--decision-workers", type=int, default=0, metavar="N", help="decide simultaneous team turns in N worker processes")
+    parser.add_argument("--games", type=int, default=3, help="number of full games per scenario")
+    parser.add_argument("--max-turns", type=int, default=200, help="games are stopped after this many turns")
+    parser.add_argument("--warmup-turns", type=int, default=20, help="turns played before path estimates are measured")
+    parser.add_argument("--min-time", type=float, default=1.0, help="minimum time spent on every micro-benchmark in seconds")
+    parser.add_argument("--max-runs", type=int, default=1000, help="maximum number of repetitions of every micro-benchmark")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    parser.add_argument("--baseline", help="compare the report with a JSON report saved earlier")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown reported as regression")
+    options = parser.parse_args()
+    if options.decision_workers and options.decisions != "simultaneous":
+        parser.error("--decision-workers needs --decisions simultaneous")
+
+    report = run_suite(options)
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+        if compare(report, baseline, options.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
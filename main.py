@@ -1,28 +1,56 @@
-from src.run_modes import pygame_simulation, team_winrate
-import sys
+from src.run_modes import pygame_simulation, replay_simulation, team_winrate, save_corpus
+from src.generators import GENERATORS
+from util.consts import GENERATOR, EXPLORATION, DECISIONS, AUTOMOVE_DELAY
+import argparse
 
 
 
 
 def main():
     # load CLI arguments
-    # arguments "--run $NumberOfSimulations"
-    flag = False
-    runs = 0
-    try:
-        if sys.argv[1] == "--run":
-            flag = True
-            runs = int(sys.argv[2])
-
-    except IndexError or ValueError:
-        flag = False
-
-
-    if not flag:
-        pygame_simulation()
+    # arguments "--run $NumberOfSimulations [--workers N] [--seed S] [--stats FILE] [--generator NAME] [--exploration NAME] [--decisions NAME [--decision-workers N]] [--corpus FILE | --save-corpus FILE] [--log FILE]"
+    # without --run: pygame viewer "[--tick-rate T] [--stats FILE] [--generator NAME] [--exploration NAME] [--decisions NAME [--decision-workers N]] [--record FILE | --replay FILE]"
+    parser = argparse.ArgumentParser(description="Autonomous agents in a maze")
+    parser.add_argument("--run", type=int, metavar="N", help="play N games without pygame and print statistics")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes for --run")
+    parser.add_argument("--seed", type=int, help="master seed for --run, games are reproducible for the same seed")
+    parser.add_argument("--stats", metavar="FILE", help="instrument the games and write counters and timings as JSON to FILE")
+    parser.add_argument("--generator", choices=sorted(GENERATORS), default=GENERATOR, help="maze generator")
+    parser.add_argument("--exploration", choices=["nearest", "field"], default=EXPLORATION, help="exploration of the cooperative team")
+    parser.add_argument("--decisions", choices=["sequential", "simultaneous"], default=DECISIONS, help="team turns: robots decide and move in turn, or all decide first")
+    parser.add_argument("--decision-workers", type=int, default=0, metavar="N", help="decide simultaneous team turns in N worker processes")
+    parser.add_argument("--corpus", metavar="FILE", help="replay the first N scenarios of a corpus file instead of generating mazes")
+    parser.add_argument("--save-corpus", metavar="FILE", help="save the mazes of the N games as a corpus file instead of playing them")
+    parser.add_argument("--tick-rate", type=float, default=1 / AUTOMOVE_DELAY, metavar="T", help="turns per second of automatic play in the pygame viewer (F fast-forwards)")
+    parser.add_argument("--record", metavar="FILE", help="record the game of the pygame viewer to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="show a game recorded with --record instead of playing a new one")
+    parser.add_argument("--log", metavar="FILE", help="append a JSON line per game to FILE and resume the run if FILE already has games")
+    args = parser.parse_args()
+    if (args.corpus or args.save_corpus) and args.run is None:
+        parser.error("--corpus and --save-corpus need --run")
+    if args.log and (args.run is None or args.save_corpus):
+        parser.error("--log needs --run and can not be used with --save-corpus")
+    if args.decision_workers and args.decisions != "simultaneous":
+        parser.error("--decision-workers needs --decisions simultaneous")
+    if not args.tick_rate > 0:
+        parser.error("--tick-rate must be positive")
+    if (args.record or args.replay) and args.run is not None:
+        parser.error("--record and --replay are only used by the pygame viewer")
+
+    if args.replay:
+        replay_simulation(args.replay, tick_rate=args.tick_rate)
+    elif args.run is None:
+        pygame_simulation(stats_path=args.stats, generator=args.generator, tick_rate=args.tick_rate, record_path=args.record, exploration=args.exploration,
+                          decisions=args.decisions, decision_workers=args.decision_workers)
+    elif args.save_corpus:
+        save_corpus(args.save_corpus, args.run, seed=args.seed, generator=args.generator)
     else:
-        team_winrate(runs)
+        try:
+            team_winrate(args.run, workers=args.workers, seed=args.seed, stats_path=args.stats, generator=args.generator, corpus=args.corpus, log_path=args.log, exploration=args.exploration,
+                         decisions=args.decisions, decision_workers=args.decision_workers)
+        except ValueError as error:
+            # a corpus that is too small or a log of another run
+            parser.error(str(error))
 
 if __name__ == "__main__":
     main()
-
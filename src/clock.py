@@ -0,0 +1,104 @@
+import threading
+import time
+from contextlib import contextmanager
+from src.game import Game
+from util.consts import AUTOMOVE_DELAY
+
+
+class SimulationClock:
+    """
+    Plays a game in a background thread, independently of the frame rate of the viewer.
+    While running, turns are played at tick_rate turns per second, or as fast as possible in fast-forward mode.
+    The viewer reads the game inside `with clock.state():`, which waits for the current turn to end
+    and keeps the simulation from starting the next one, so it always sees the state between two turns.
+    """
+    def __init__(self, game: Game, tick_rate: float = 1 / AUTOMOVE_DELAY):
+        """
+        :param game: game to play, the clock starts paused
+        :param tick_rate: turns per second when not fast-forwarding, must be positive
+        """
+        if not tick_rate > 0:
+            raise ValueError("the tick rate must be positive")
+        self.game = game
+        self.tick_rate = tick_rate
+        self.fast = False
+        self.lock = threading.Lock()
+        # the viewer holds the turnstile while it waits for the lock, so the simulation can not take the lock again first
+        self.turnstile = threading.Lock()
+        self.running = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the simulation thread after the current turn
+        """
+        self.stopped = True
+        self.running.set()
+        self.thread.join()
+
+    def toggle(self):
+        """
+        Pauses or resumes the simulation
+        """
+        if self.running.is_set():
+            self.running.clear()
+        else:
+            self.running.set()
+
+    def toggle_fast(self):
+        """
+        Switches between tick_rate and fast-forward
+        """
+        self.fast = not self.fast
+
+    @contextmanager
+    def state(self):
+        """
+        Holds the simulation between two turns and yields the game
+        """
+        with self.turnstile:
+            self.lock.acquire()
+        try:
+            yield self.game
+        finally:
+            self.lock.release()
+
+    def step(self):
+        """
+        Plays one turn now (e.g. while paused)
+        """
+        with self.state():
+            if not self.game.finished():
+                self.game.turn()
+
+    def run(self):
+        """
+        Simulation loop of the thread
+        """
+        next_tick = time.perf_counter()
+        while not self.stopped:
+            if not self.running.is_set():
+                self.running.wait()
+                next_tick = time.perf_counter()
+                continue
+            with self.turnstile:
+                pass
+            with self.lock:
+                if self.game.finished():
+                    break
+                self.game.turn()
+            if self.fast:
+                next_tick = time.perf_counter()
+                continue
+            next_tick += 1 / self.tick_rate
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # do not try to catch up after slow turns
+                next_tick = time.perf_counter()
+
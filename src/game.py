@@ -0,0 +1,79 @@
+import random
+from src.maze import Maze
+from src.robot import RobotCooperative, RobotSelfInterested
+from src.team import CooperativeTeam, SelfInterestedTeam, DecisionPool
+from util.consts import MAZE_X, MAZE_Y, ITEM_COUNT, ROBOT_COUNT, GENERATOR, DENSITY_COEFFICIENT, EXPLORATION, DECISIONS
+
+
+class Game:
+    """
+    Class representing one game: the maze and the two competing teams.
+    Cooperative team is team1, self-interested team is team2.
+    """
+    def __init__(self, rng=random, x: int = MAZE_X, y: int = MAZE_Y, itemCount: int = ITEM_COUNT, robotCount: int = ROBOT_COUNT, generator: str = GENERATOR, maze: Maze = None, density: float = DENSITY_COEFFICIENT, exploration: str = EXPLORATION, decisions: str = DECISIONS, pool: DecisionPool = None):
+        """
+        Generates the maze and sets up both teams.
+        :param rng: random number generator used for the maze generation
+        :param x: width of the maze
+        :param y: height of the maze
+        :param itemCount: number of items in the maze
+        :param robotCount: number of robots of both teams together
+        :param generator: name of the maze generator (see src.generators)
+        :param maze: maze to play in (e.g. loaded from a scenario corpus) instead of generating one, the other parameters are not used then
+        :param density: wall density of the maze generator
+        :param exploration: exploration of the cooperative team, "nearest" or "field" (see CooperativeTeam)
+        :param decisions: team turns of both teams, "sequential" or "simultaneous" (see CooperativeTeam)
+        :param pool: DecisionPool deciding the actions of simultaneous turns in parallel, the game does not close it
+        """
+        self.turns = 0
+        if maze is None:
+            maze = Maze(x, y)
+            maze.generate(itemCount=itemCount, robotCount=robotCount//2, rng=rng, generator=generator, density=density)
+        self.maze = maze
+        self.itemCount = maze.itemCount
+        self.team1 = CooperativeTeam(self.maze.maze, self.maze.deliveryPoints[0][0], self.maze.deliveryPoints[0][1], exploration, decisions, pool)
+        self.team2 = SelfInterestedTeam(self.maze.maze, self.maze.deliveryPoints[1][0], self.maze.deliveryPoints[1][1], decisions, pool)
+        for robot in self.maze.robots:
+            if isinstance(robot, RobotCooperative):
+                self.team1.add_member(robot)
+            elif isinstance(robot, RobotSelfInterested):
+                self.team2.add_member(robot)
+        self.team1.initMemory(self.maze.x, self.maze.y)
+
+    def fork(self) -> "Game":
+        """
+        Returns an independent copy of the game in its current state, e.g. to try out moves or branch a what-if
+        Everything that changes during a game (grid, memories, contexts, robots) is copied: the grid with a single
+        copy of its cells, the memories copy-on-write (a memory is copied as a whole on its first change after the fork,
+        memories that do not change are never copied), while the rest of the maze and the cached frontier fields are shared.
+        Forking a game that is not played further keeps a snapshot of it, forking the snapshot again branches from that state.
+        """
+        other = Game.__new__(Game)
+        other.__dict__.update(self.__dict__)
+        maze = Maze.__new__(Maze)
+        maze.__dict__.update(self.maze.__dict__)
+        maze.maze = self.maze.maze.copy()
+        other.maze = maze
+        other.team1 = self.team1.copy(maze.maze)
+        other.team2 = self.team2.copy(maze.maze)
+        robots = dict(zip(map(id, self.team1.members + self.team2.members), other.team1.members + other.team2.members))
+        maze.robots = [robots[id(robot)] for robot in self.maze.robots]
+        return other
+
+    def turn(self):
+        """
+        Executes one turn of both teams.
+        """
+        self.turns += 1
+        self.team1.turn()
+        self.team2.turn()
+
+    def finished(self) -> bool:
+        return self.team1.context.score + self.team2.context.score == self.itemCount
+
+    def play(self):
+        """
+        Plays the game until all items are delivered.
+        """
+        while not self.finished():
+            self.turn()
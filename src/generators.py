@@ -0,0 +1,148 @@
+"""
+Maze generators.
+
+A generator is a function (maze, itemCount, robotCount, rng, density) that fills an empty Maze with walls, items,
+delivery points and robots, so that every object can reach every other one. Maze.generate picks one from GENERATORS by name.
+- density: objects are placed first, random paths between them are kept free and the remaining cells get walls by the density
+  (DENSITY_COEFFICIENT unless another one is passed)
+- kruskal: perfect maze from Kruskal's algorithm (random order of walls, union-find over the flat grid)
+- backtracker: perfect maze from the recursive backtracker (iterative, with an explicit stack)
+The perfect mazes have about half of their cells as walls regardless of the density.
+"""
+import random
+from src.objects import EMPTY, ITEM, WALL, PATH
+from src.robot import RobotCooperative, RobotSelfInterested
+from util.consts import DENSITY_COEFFICIENT
+from util.helpers import replaceRandomCells
+from util.unionfind import UnionFind, open_components
+
+# translation table turning PATH cells back into EMPTY ones
+CLEAR_PATHS = bytes(EMPTY if code == PATH else code for code in range(256))
+
+
+def add_objects(maze, cells: list, itemCount: int, robotCount: int):
+    """
+    Places items, then the two delivery points, then the robots (alternating cooperative and self-interested) on the given cells
+    :param maze: maze to place the objects in
+    :param cells: flat indices of distinct cells, itemCount + 2 + robotCount * 2 of them
+    :param itemCount: number of items
+    :param robotCount: number of robots of one team
+    """
+    maze.itemCount = itemCount
+    for index in cells[:itemCount]:
+        maze.maze.cells[index] = ITEM
+    for index in cells[itemCount:itemCount + 2]:
+        maze.deliveryPoints.append(maze.maze.coords(index))
+    for i, index in enumerate(cells[itemCount + 2:itemCount + 2 + robotCount * 2]):
+        x, y = maze.maze.coords(index)
+        if i % 2 == 0:
+            maze.add_robot(RobotCooperative(x, y))
+        else:
+            maze.add_robot(RobotSelfInterested(x, y))
+
+def density(maze, itemCount: int, robotCount: int, rng=random, density: float = DENSITY_COEFFICIENT):
+    """
+    Objects are sampled without replacement, paths between them are carved (Maze.create_paths)
+    and walls are placed on the remaining empty cells in time linear in the maze size.
+    (density - 1) of the empty cells left after carving become walls.
+    """
+    add_objects(maze, rng.sample(range(maze.x * maze.y), itemCount + 2 + robotCount * 2), itemCount, robotCount)
+    cells = maze.maze.cells
+    # make sure paths are clear
+    maze.create_paths(rng)
+    # add walls to the maze
+    left_over = cells.count(EMPTY)
+    wallCount = left_over * (density - 1)
+    replaceRandomCells(cells, EMPTY, WALL, int(wallCount), rng)
+    cells[:] = cells.translate(CLEAR_PATHS)
+
+def lattice(maze) -> list:
+    """
+    Fills the maze with walls except the rooms (cells with both coordinates even)
+    and the last row / column if it has no rooms (it stays empty and is reachable along the edge)
+    Returns the flat indices of the rooms
+    """
+    x, y = maze.x, maze.y
+    room_column = bytearray(WALL if j % 2 else EMPTY for j in range(y))
+    wall_column = bytearray([WALL]) * y
+    if y % 2 == 0:
+        room_column[-1] = EMPTY
+        wall_column[-1] = EMPTY
+    columns = [room_column if i % 2 == 0 else wall_column for i in range(x)]
+    if x % 2 == 0:
+        columns[-1] = bytearray([EMPTY]) * y
+    maze.maze.cells[:] = b"".join(columns)
+    return [i * y + j for i in range(0, x, 2) for j in range(0, y, 2)]
+
+def add_objects_connected(maze, itemCount: int, robotCount: int, rng=random):
+    """
+    Samples the cells of the objects from the largest set of connected open cells,
+    found by a single union-find pass, so every object can reach every other one
+    """
+    sets = open_components(maze.maze.cells, maze.x, maze.y)
+    find = sets.find
+    open_cells = [i for i, code in enumerate(maze.maze.cells) if code != WALL]
+    largest = find(max(open_cells, key=lambda i: sets.size[find(i)]))
+    reachable = [i for i in open_cells if find(i) == largest]
+    add_objects(maze, rng.sample(reachable, itemCount + 2 + robotCount * 2), itemCount, robotCount)
+
+def kruskal(maze, itemCount: int, robotCount: int, rng=random, density: float = DENSITY_COEFFICIENT):
+    """
+    Kruskal's algorithm: walls between neighbouring rooms are visited in random order
+    and removed if the rooms are not connected yet.
+    """
+    rooms = lattice(maze)
+    x, y = maze.x, maze.y
+    edges = []
+    for room in rooms:
+        if room + 2 * y < x * y:
+            edges.append((room, room + 2 * y))
+        if (room % y) + 2 < y:
+            edges.append((room, room + 2))
+    rng.shuffle(edges)
+    sets = UnionFind(x * y)
+    cells = maze.maze.cells
+    for a, b in edges:
+        if sets.union(a, b):
+            cells[(a + b) // 2] = EMPTY
+    add_objects_connected(maze, itemCount, robotCount, rng)
+
+def backtracker(maze, itemCount: int, robotCount: int, rng=random, density: float = DENSITY_COEFFICIENT):
+    """
+    Recursive backtracker with an explicit stack: walks to random unvisited neighbouring rooms
+    and goes back when there is none.
+    """
+    rooms = lattice(maze)
+    x, y = maze.x, maze.y
+    cells = maze.maze.cells
+    visited = bytearray(x * y)
+    start = rng.choice(rooms)
+    visited[start] = 1
+    stack = [start]
+    while stack:
+        current = stack[-1]
+        cx, cy = divmod(current, y)
+        neighbors = []
+        if cx >= 2 and not visited[current - 2 * y]:
+            neighbors.append(current - 2 * y)
+        if cx + 2 < x and not visited[current + 2 * y]:
+            neighbors.append(current + 2 * y)
+        if cy >= 2 and not visited[current - 2]:
+            neighbors.append(current - 2)
+        if cy + 2 < y and not visited[current + 2]:
+            neighbors.append(current + 2)
+        if not neighbors:
+            stack.pop()
+            continue
+        next = rng.choice(neighbors)
+        cells[(current + next) // 2] = EMPTY
+        visited[next] = 1
+        stack.append(next)
+    add_objects_connected(maze, itemCount, robotCount, rng)
+
+
+GENERATORS = {
+    "density": density,
+    "kruskal": kruskal,
+    "backtracker": backtracker,
+}
@@ -0,0 +1,218 @@
+from array import array
+from src.objects import EMPTY, UNKNOWN, KNOWN_PASSABLE
+
+
+class Grid:
+    """
+    Compact 2D grid of cell codes (see src.objects).
+    Cells are stored column by column in a single bytearray, so cell (x, y) lives at index x * y_size + y.
+    """
+    def __init__(self, x: int, y: int, fill: int = EMPTY):
+        self.x = x
+        self.y = y
+        self.cells = bytearray([fill]) * (x * y)
+
+    def coords(self, index: int) -> tuple:
+        """
+        Returns the (x, y) coordinates of the cell with the given flat index.
+        """
+        return divmod(index, self.y)
+
+    def get(self, x: int, y: int) -> int:
+        """
+        Returns the code of the cell at the given coordinates.
+        :param x: x coordinate of the cell
+        :param y: y coordinate of the cell
+        """
+        return self.cells[x * self.y + y]
+
+    def set(self, x: int, y: int, code: int):
+        """
+        Sets the code of the cell at the given coordinates.
+        :param x: x coordinate of the cell
+        :param y: y coordinate of the cell
+        :param code: new cell code
+        """
+        self.cells[x * self.y + y] = code
+
+    def positions(self, code: int) -> list:
+        """
+        Returns coordinates of all cells with the given code, in index order.
+        :param code: cell code to look for
+        """
+        cells = self.cells
+        result = []
+        i = cells.find(code)
+        while i != -1:
+            result.append(divmod(i, self.y))
+            i = cells.find(code, i + 1)
+        return result
+
+    def window_positions(self, code: int, x: int, y: int) -> list:
+        """
+        Returns coordinates of the cells with the given code in the 5x5 window around x, y (clipped to the grid),
+        column by column.
+        """
+        cells = self.cells
+        size_y = self.y
+        low = max(y - 2, 0)
+        high = min(y + 3, size_y)
+        result = []
+        for cx in range(max(x - 2, 0), min(x + 3, self.x)):
+            base = cx * size_y
+            i = cells.find(code, base + low, base + high)
+            while i != -1:
+                result.append((cx, i - base))
+                i = cells.find(code, i + 1, base + high)
+        return result
+
+    def copy(self):
+        other = Grid.__new__(type(self))
+        other.__dict__.update(self.__dict__)
+        other.cells = bytearray(self.cells)
+        return other
+
+
+class Memory(Grid):
+    """
+    Grid of what a robot (or a team) knows about the maze.
+    Unknown cells hold UNKNOWN, every other cell holds the code that was seen there.
+    unknown[index] is the number of unknown cells in the 5x5 window around the cell (clipped to the grid),
+    it is updated locally whenever a cell becomes known.
+    Copies are copy-on-write: a copy shares the cells, unknown counts and frontier with its original
+    until one of them changes a cell.
+    """
+    def __init__(self, x: int, y: int):
+        super().__init__(x, y, UNKNOWN)
+        self.version = 0 # incremented whenever a cell changes
+        self.frontier = set() # indices of unknown cells next to a known passable cell
+        self.known = 0 # number of known cells
+        # distance field of the frontier cache and the work of plain frontier searches since the last change,
+        # see util.helpers.BFSFindZero
+        self.frontier_field = None
+        self.frontier_field_version = 0
+        self.frontier_search_work = 0
+        self.sharers = [1] # number of memories sharing cells, unknown and frontier, the list is shared by them
+        # all cells are unknown, so the count is the size of the clipped window
+        column = [min(cy + 2, y - 1) - max(cy - 2, 0) + 1 for cy in range(y)]
+        columns = {}
+        self.unknown = array('B')
+        for cx in range(x):
+            width = min(cx + 2, x - 1) - max(cx - 2, 0) + 1
+            if width not in columns:
+                columns[width] = array('B', (width * count for count in column))
+            self.unknown.extend(columns[width])
+
+    def set(self, x: int, y: int, code: int):
+        """
+        Sets the code of the cell at the given coordinates and bumps the version if it changed.
+        Keeps the frontier and the unknown counts up to date.
+        :param x: x coordinate of the cell
+        :param y: y coordinate of the cell
+        :param code: new cell code
+        """
+        index = x * self.y + y
+        old = self.cells[index]
+        if old != code:
+            if self.sharers[0] > 1:
+                self.own()
+            self.cells[index] = code
+            self.changed(x, y, old, code)
+
+    def changed(self, x: int, y: int, old: int, code: int):
+        """
+        Updates the version, the frontier and the unknown counts after the cell changed from old to code.
+        """
+        self.version += 1
+        if old == UNKNOWN or code == UNKNOWN:
+            self.known += 1 if old == UNKNOWN else -1
+            self.update_unknown(x, y, -1 if old == UNKNOWN else 1)
+        if old == UNKNOWN or KNOWN_PASSABLE[old] != KNOWN_PASSABLE[code]:
+            self.update_frontier(x, y)
+
+    def reveal(self, grid: Grid, x: int, y: int):
+        """
+        Copies the 5x5 window around the given coordinates from the grid, one column slice at a time.
+        Columns that did not change are skipped after a single slice comparison.
+        :param grid: grid to copy from (of the same size)
+        :param x: x coordinate of the window center
+        :param y: y coordinate of the window center
+        """
+        cells = self.cells
+        source = grid.cells
+        size_y = self.y
+        low = max(y - 2, 0)
+        high = min(y + 3, size_y)
+        for cx in range(max(x - 2, 0), min(x + 3, self.x)):
+            start = cx * size_y + low
+            end = cx * size_y + high
+            old = cells[start:end]
+            new = source[start:end]
+            if old == new:
+                continue
+            if self.sharers[0] > 1:
+                self.own()
+                cells = self.cells
+            cells[start:end] = new
+            for offset in range(end - start):
+                if old[offset] != new[offset]:
+                    self.changed(cx, low + offset, old[offset], new[offset])
+
+    def update_unknown(self, x: int, y: int, delta: int):
+        """
+        Adds delta to the unknown counts of the windows containing the cell at the given coordinates.
+        """
+        unknown = self.unknown
+        size_y = self.y
+        low = max(y - 2, 0)
+        high = min(y + 3, size_y)
+        for cx in range(max(x - 2, 0), min(x + 3, self.x)):
+            base = cx * size_y
+            for index in range(base + low, base + high):
+                unknown[index] += delta
+
+    def update_frontier(self, x: int, y: int):
+        """
+        Recomputes frontier membership of the cell at the given coordinates and of its neighbors.
+        """
+        cells = self.cells
+        size_x = self.x
+        size_y = self.y
+        for cx, cy in ((x, y), (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if 0 <= cx < size_x and 0 <= cy < size_y:
+                index = cx * size_y + cy
+                if cells[index] != UNKNOWN:
+                    self.frontier.discard(index)
+                    continue
+                if (cx > 0 and KNOWN_PASSABLE[cells[index - size_y]]) or (cx < size_x - 1 and KNOWN_PASSABLE[cells[index + size_y]]) \
+                        or (cy > 0 and KNOWN_PASSABLE[cells[index - 1]]) or (cy < size_y - 1 and KNOWN_PASSABLE[cells[index + 1]]):
+                    self.frontier.add(index)
+                else:
+                    self.frontier.discard(index)
+
+    def own(self):
+        """
+        Gives the memory its own cells, unknown counts and frontier before it changes them while they are shared
+        """
+        self.sharers[0] -= 1
+        self.sharers = [1]
+        self.cells = bytearray(self.cells)
+        self.unknown = array('B', self.unknown)
+        self.frontier = set(self.frontier)
+
+    def copy(self):
+        """
+        Returns a copy-on-write copy in O(1): the memory that changes a cell first copies the shared data
+        A copy that is dropped unchanged still counts as sharing, so the original then copies once more than needed.
+        """
+        other = Memory.__new__(type(self))
+        other.__dict__.update(self.__dict__)
+        self.sharers[0] += 1
+        return other
+
+    def __getstate__(self) -> dict:
+        # the frontier field cache is left out when pickling (e.g. sending the memory to a worker process)
+        state = dict(self.__dict__)
+        state["frontier_field"] = None
+        state["sharers"] = [1]
+        return state
@@ -1,9 +1,10 @@
-import pygame
-from src.robot import Robot, RobotCooperative, RobotSelfInterested
-from util.consts import DENSITY_COEFFICIENT
-from src.objects import Empty, Item, Wall
+from src.robot import Robot
+from util.consts import GENERATOR, DENSITY_COEFFICIENT
+from src.objects import EMPTY, ITEM, PATH
+from src.grid import Grid
 import random
-from util.helpers import getRandomPath
+from util.helpers import carveRandomPath
+from src.generators import GENERATORS
 
 
 class Maze:
@@ -13,148 +14,81 @@ class Maze:
     def __init__(self, x : int, y: int):
         self.x = x
         self.y = y
-        self.maze = [[Empty() for _ in range(y)] for _ in range(x)]
+        self.maze = Grid(x, y, EMPTY)
         self.robots = []
         self.itemCount = 0
         self.deliveryPoints = []
+        self.seed = None # seed the maze was generated from, if known
 
-    def get(self, x: int, y: int):
+    def get(self, x: int, y: int) -> int:
         """
-        Returns the item at the given coordinates in the maze.
-        :param x: x coordinate of the item
-        :param y: y coordinate of the item
+        Returns the cell code at the given coordinates in the maze.
+        :param x: x coordinate of the cell
+        :param y: y coordinate of the cell
         """
-        return self.maze[x][y]
-    def set(self, x: int, y: int, item):
+        return self.maze.get(x, y)
+    def set(self, x: int, y: int, code: int):
         """
-        Sets the item at the given coordinates in the maze.
-        :param x: x coordinate of the item
-        :param y: y coordinate of the item
+        Sets the cell code at the given coordinates in the maze.
+        :param x: x coordinate of the cell
+        :param y: y coordinate of the cell
+        :param code: cell code to set
         """
-        item.x = x
-        item.y = y
-        self.maze[x][y] = item
-    def add_robot(self, robot: Robot):
-        self.robots.append(robot)
+        self.maze.set(x, y, code)
+    def save(self, path: str):
+        """
+        Saves the maze in the binary scenario format (see src.scenario).
+        :param path: file to write
+        """
+        from src.scenario import pack_maze
+        with open(path, "wb") as file:
+            file.write(pack_maze(self))
 
-    def draw(self, screen: pygame.Surface):
+    @staticmethod
+    def load(path: str) -> "Maze":
         """
-        Draws the maze on the given surface.
-        :param screen: surface to draw on
+        Loads a maze saved by save.
+        :param path: file to read
         """
-        for x in range(len(self.maze)):
-            for y in range(len(self.maze[0])):
-                self.maze[x][y].draw(screen, x, y)
-        for robot in self.robots:
-            robot.draw(screen)
+        from src.scenario import unpack_maze
+        with open(path, "rb") as file:
+            return unpack_maze(file.read())
 
+    def add_robot(self, robot: Robot):
+        self.robots.append(robot)
 
-    def create_paths(self):
+    def create_paths(self, rng=random):
         """
         Ensures that there are paths between all items, robots and delivery points.
+        Paths are carved in place, empty cells on them are set to PATH (generate turns them back to EMPTY).
+        Objects are connected in random order, each one to the path network towards a random already connected object.
+        :param rng: random number generator to use
         """
-        grid_with_paths = [[Empty() for _ in range(self.y)] for _ in range(self.x)]
-        for x in range(len(self.maze)):
-            for y in range(len(self.maze[0])):
-                grid_with_paths[x][y] = self.maze[x][y]
-        all_objects = []
-        # add items
-        for x in range(len(self.maze)):
-            for y in range(len(self.maze[0])):
-                if not isinstance(self.maze[x][y], Empty):
-                    all_objects.append((x, y))
-        # add robots
-        for robot in self.robots:
-            all_objects.append((robot.x, robot.y))
-        # add delivery points
-        for point in self.deliveryPoints:
-            all_objects.append(point)
-        # pick 2 random points from all_objects
-        one = random.choice(all_objects)
-        two = random.choice(all_objects)
-        all_objects.remove(one)
-        while one == two:
-            two = random.choice(all_objects)
-        all_objects.remove(two)
-        processed = []
-        processed.append(one)
-        processed.append(two)
-        # create a path between the two points
-        getRandomPath(one, two, grid_with_paths)
-        while(len(all_objects) > 0):
-            # pick a random point from all_objects
-            next = random.choice(all_objects)
-            all_objects.remove(next)
-            # pick a random point from processed
-            two = random.choice(processed)
-            getRandomPath(next, two, grid_with_paths)
+        y = self.y
+        all_objects = [x * y + iy for x, iy in self.maze.positions(ITEM)]
+        all_objects += [robot.x * y + robot.y for robot in self.robots]
+        all_objects += [x * y + iy for x, iy in self.deliveryPoints]
+        # robots do not occupy cells, so several objects can share one
+        all_objects = list(dict.fromkeys(all_objects))
+        rng.shuffle(all_objects)
+        if not all_objects:
+            return
+        processed = [all_objects[0]]
+        connected = set(processed)
+        if self.maze.cells[processed[0]] == EMPTY:
+            self.maze.cells[processed[0]] = PATH
+        for next in all_objects[1:]:
+            carveRandomPath(self.maze, next, rng.choice(processed), connected, rng)
             processed.append(next)
+            connected.add(next)
 
-        return grid_with_paths
-
-
-
-    def generate(self, itemCount: int, robotCount: int):
+    def generate(self, itemCount: int, robotCount: int, rng=random, generator: str = GENERATOR, density: float = DENSITY_COEFFICIENT):
         """
         Generates the maze with the given number of items and robots.
         :param itemCount: number of items to generate
         :param robotCount: number of robots to generate
+        :param rng: random number generator to use, pass a seeded random.Random for reproducible mazes
+        :param generator: name of the generator in src.generators.GENERATORS
+        :param density: wall density of the density generator (the perfect mazes do not use it)
         """
-        # add all robots, items and delivery points to the maze
-        self.itemCount = itemCount
-
-        for i in range(itemCount):
-            while True:
-                x = random.randint(0, self.x - 1)
-                y = random.randint(0, self.y - 1)
-                if isinstance(self.maze[x][y], Empty):
-                    break
-            item = Item()
-            self.set(x, y, item)
-        for i in range(2):
-            while True:
-                x = random.randint(0, self.x - 1)
-                y = random.randint(0, self.y - 1)
-                if isinstance(self.maze[x][y], Empty):
-                    break
-            self.deliveryPoints.append((x, y))
-
-        for i in range(robotCount * 2):
-            while True:
-                x = random.randint(0, self.x - 1)
-                y = random.randint(0, self.y - 1)
-                if isinstance(self.maze[x][y], Empty):
-                    if ((x, y) not in self.deliveryPoints):
-                        break
-            if i % 2 == 0:
-                self.add_robot(RobotCooperative(x, y))
-            else:
-                self.add_robot(RobotSelfInterested(x, y))
-
-        # make sure paths are clear
-        paths = self.create_paths()
-        # add walls to the maze
-        nonempty = 0
-        for x in range(len(paths)):
-            for y in range(len(paths[0])):
-                if not isinstance(paths[x][y], Empty):
-                    nonempty += 1
-        grid_size = len(paths) * len(paths[0])
-        left_over = grid_size - nonempty
-        wallCount = left_over * (DENSITY_COEFFICIENT - 1)
-        for i in range(int (wallCount)):
-            while True:
-                x = random.randint(0, self.x - 1)
-                y = random.randint(0, self.y - 1)
-                if isinstance(paths[x][y], Empty) and isinstance(self.maze[x][y], Empty):
-                    break
-            self.set(x, y, Wall())
-
-
-
-
-
-
-
-
-
+        GENERATORS[generator](self, itemCount, robotCount, rng, density)
@@ -0,0 +1,158 @@
+import pygame
+from util.consts import RECT_SIZE
+from src.objects import WALL, ITEM, EMPTY
+from src.maze import Maze
+from src.robot import Robot, RobotSelfInterested
+
+
+# Images under CC BY 4.0 from https://icon-icons.com/icon/technology-robot/113340 (robot2.png has inverted colors)
+ROBOT_IMAGE = "assets/robot.png"
+ROBOT_SELF_INTERESTED_IMAGE = "assets/robot2.png"
+
+_images = {}
+
+
+def robot_image(robot: Robot) -> pygame.Surface:
+    """
+    Returns the scaled image of the robot, every image is loaded from disk only once.
+    :param robot: The robot to get the image for.
+    """
+    path = ROBOT_SELF_INTERESTED_IMAGE if isinstance(robot, RobotSelfInterested) else ROBOT_IMAGE
+    image = _images.get(path)
+    if image is None:
+        image = pygame.transform.scale(pygame.image.load(path), (RECT_SIZE, RECT_SIZE))
+        _images[path] = image
+    return image
+
+
+def draw_cell(screen: pygame.Surface, code: int, x: int, y: int, delivery: int = 0, inmemory: bool = False):
+    """
+    Draw a cell on the screen.
+    :param screen: The pygame surface to draw on.
+    :param code: The code of the cell.
+    :param x: The x-coordinate of the cell.
+    :param y: The y-coordinate of the cell.
+    :param delivery: 1 or 2 if the cell is a delivery point of the first or second team, 0 otherwise.
+    :param inmemory: True if the cell should be highlighted as remembered.
+    """
+    if code == WALL:
+        pygame.draw.rect(screen, (0, 0, 0), (x * RECT_SIZE, y * RECT_SIZE, RECT_SIZE, RECT_SIZE))
+        return
+    if code == ITEM:
+        pygame.draw.circle(screen, (255, 0, 0), (x * RECT_SIZE + RECT_SIZE // 2, y * RECT_SIZE + RECT_SIZE // 2), RECT_SIZE // 4)
+        return
+    if delivery == 1:
+        # blue
+        pygame.draw.rect(screen, (0, 0, 255), (x * RECT_SIZE, y * RECT_SIZE, RECT_SIZE, RECT_SIZE))
+    elif delivery == 2:
+        # orange
+        pygame.draw.rect(screen, (255, 165, 0), (x * RECT_SIZE, y * RECT_SIZE, RECT_SIZE, RECT_SIZE))
+    elif inmemory:
+        # green
+        pygame.draw.rect(screen, (0, 255, 0), (x * RECT_SIZE, y * RECT_SIZE, RECT_SIZE, RECT_SIZE))
+    pygame.draw.rect(screen, (0, 0, 0), (x * RECT_SIZE, y * RECT_SIZE, RECT_SIZE, RECT_SIZE), 1)
+
+
+def draw_robot(screen: pygame.Surface, robot: Robot):
+    """
+    Draw the robot on the screen.
+    :param screen: The pygame surface to draw on.
+    :param robot: The robot to draw.
+    """
+    screen.blit(robot_image(robot), (robot.x * RECT_SIZE, robot.y * RECT_SIZE))
+
+
+class MazeView:
+    """
+    Draws a maze incrementally.
+    Walls, grid lines and delivery points never change, so they are rendered once to a cached background surface.
+    Every frame only the cells whose content changed since the previous frame (robots arriving or leaving,
+    picked up items, memory overlay toggles) are restored from the background, drawn again and updated on the display.
+    """
+    def __init__(self, screen: pygame.Surface, maze: Maze):
+        """
+        :param screen: display surface
+        :param maze: maze to draw, its walls and delivery points must not change
+        """
+        self.screen = screen
+        self.maze = maze
+        self.delivery = {}
+        for i, point in enumerate(maze.deliveryPoints):
+            self.delivery[point[0] * maze.y + point[1]] = 1 if i % 2 == 0 else 2
+        self.background = pygame.Surface(screen.get_size())
+        self.background.fill((255, 255, 255))
+        cells = maze.maze.cells
+        for x in range(maze.x):
+            for y in range(maze.y):
+                index = x * maze.y + y
+                # non-wall cells as empty ones, items are drawn over them
+                draw_cell(self.background, WALL if cells[index] == WALL else EMPTY, x, y, self.delivery.get(index, 0))
+        self.items = set()
+        self.overlay = bytearray(maze.x * maze.y)
+        self.robots = {}
+
+    def robot_cells(self) -> dict:
+        """
+        Returns the robots of the maze by their flat cell index (in maze.robots order)
+        """
+        cells = {}
+        for robot in self.maze.robots:
+            cells.setdefault(robot.x * self.maze.y + robot.y, []).append(robot)
+        return cells
+
+    def draw_cells(self, indices, robots: dict) -> list:
+        """
+        Draws the cells with the given flat indices from the background, items, overlay and robots
+        Returns the rectangles of the cells
+        """
+        cells = self.maze.maze.cells
+        rects = []
+        for index in indices:
+            x, y = divmod(index, self.maze.y)
+            rect = pygame.Rect(x * RECT_SIZE, y * RECT_SIZE, RECT_SIZE, RECT_SIZE)
+            self.screen.blit(self.background, rect, rect)
+            code = cells[index]
+            if code == ITEM or (self.overlay[index] and code != WALL and index not in self.delivery):
+                pygame.draw.rect(self.screen, (255, 255, 255), rect)
+                draw_cell(self.screen, code, x, y, inmemory=bool(self.overlay[index]))
+            for robot in robots.get(index, ()):
+                draw_robot(self.screen, robot)
+            rects.append(rect)
+        return rects
+
+    def draw(self, memory_overlay: bytearray = None):
+        """
+        Draws the whole maze and updates the whole display
+        :param memory_overlay: optional flat mask of cells to highlight as remembered
+        """
+        self.overlay[:] = memory_overlay if memory_overlay else bytes(len(self.overlay))
+        self.items = {x * self.maze.y + y for x, y in self.maze.maze.positions(ITEM)}
+        self.robots = self.robot_cells()
+        self.screen.blit(self.background, (0, 0))
+        self.draw_cells(self.items | {i for i, flag in enumerate(self.overlay) if flag} | self.robots.keys(), self.robots)
+        pygame.display.flip()
+
+    def update(self, memory_overlay: bytearray = None):
+        """
+        Draws the cells that changed since the last draw / update and updates only their part of the display
+        :param memory_overlay: optional flat mask of cells to highlight as remembered
+        """
+        cells = self.maze.maze.cells
+        robots = self.robot_cells()
+        dirty = set()
+        # robots can share cells, so a cell is redrawn when the list of robots on it changes
+        for index in self.robots.keys() | robots.keys():
+            if self.robots.get(index) != robots.get(index):
+                dirty.add(index)
+        # items are only ever picked up
+        picked = {index for index in self.items if cells[index] != ITEM}
+        self.items -= picked
+        dirty |= picked
+        if memory_overlay is None:
+            memory_overlay = bytes(len(self.overlay))
+        if memory_overlay != self.overlay:
+            dirty.update(i for i, (old, new) in enumerate(zip(self.overlay, memory_overlay)) if old != new)
+            self.overlay[:] = memory_overlay
+        self.robots = robots
+        if dirty:
+            pygame.display.update(self.draw_cells(dirty, robots))
@@ -0,0 +1,163 @@
+"""
+Recording and replay of played games.
+
+A recording is the scenario of the game (see src.scenario) and one action byte per robot per turn,
+robots in the order they move: the members of the cooperative team, then the members of the self-interested team.
+The low bits of an action byte are the move (STAY, LEFT, RIGHT, UP, DOWN), PICKUP and DELIVER flag the events.
+A recording file (little-endian) is:
+    header    magic b"AMZR", version u16, robot count u32, turn count u32, scenario record length u32
+    scenario  scenario record of the maze before the first turn
+    actions   turn count * robot count action bytes
+A replay applies the actions without any decision-making, and seeks through keyframes of the state
+taken every KEYFRAME_INTERVAL turns.
+"""
+import struct
+from src.game import Game
+from src.objects import EMPTY
+from src.robot import RobotCooperative
+from src.scenario import pack_maze, unpack_maze
+
+VERSION = 1
+HEADER = struct.Struct("<4sHIII")
+STAY, LEFT, RIGHT, UP, DOWN = range(5)
+PICKUP = 8
+DELIVER = 16
+MOVES = {(0, 0): STAY, (-1, 0): LEFT, (1, 0): RIGHT, (0, -1): UP, (0, 1): DOWN}
+DELTAS = {code: delta for delta, code in MOVES.items()}
+KEYFRAME_INTERVAL = 100
+
+
+class ActionRecorder:
+    """
+    Records the actions of a game, team turns report the moves of their members to it.
+    """
+    def __init__(self, game: Game):
+        """
+        :param game: game to record, it must not have started yet
+        """
+        if game.turns:
+            raise ValueError("the game has already started")
+        self.scenario = pack_maze(game.maze)
+        self.robotCount = len(game.team1.members) + len(game.team2.members)
+        self.actions = bytearray()
+        game.team1.recorder = self
+        game.team2.recorder = self
+
+    def record(self, dx: int, dy: int, pickup: bool, deliver: bool):
+        """
+        Appends the action of the next robot
+        :param dx: x step of the robot
+        :param dy: y step of the robot
+        :param pickup: True if the robot picked up an item
+        :param deliver: True if the robot delivered an item
+        """
+        self.actions.append(MOVES[dx, dy] | (PICKUP if pickup else 0) | (DELIVER if deliver else 0))
+
+    def save(self, path: str):
+        """
+        Writes the recording file
+        :param path: file to write
+        """
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(b"AMZR", VERSION, self.robotCount, len(self.actions) // max(1, self.robotCount), len(self.scenario)))
+            file.write(self.scenario)
+            file.write(self.actions)
+
+
+class Replay:
+    """
+    Replays a recording. maze holds the state after turn turns: the grid (picked up items removed)
+    and the robots at their positions, scores holds the scores of both teams and carrying which robots carry an item.
+    """
+    def __init__(self, scenario: bytes, actions: bytes, robotCount: int):
+        """
+        :param scenario: scenario record of the maze before the first turn
+        :param actions: action bytes of all turns
+        :param robotCount: number of robots of both teams
+        """
+        self.actions = actions
+        self.robotCount = robotCount
+        self.turns = len(actions) // robotCount if robotCount else 0
+        self.maze = unpack_maze(scenario)
+        # robots in the order they move, and the team (0 or 1) of every robot
+        self.robots = [robot for robot in self.maze.robots if isinstance(robot, RobotCooperative)]
+        self.teams = [0] * len(self.robots)
+        self.robots += [robot for robot in self.maze.robots if not isinstance(robot, RobotCooperative)]
+        self.teams += [1] * (len(self.robots) - len(self.teams))
+        if len(self.robots) != robotCount:
+            raise ValueError("the recording does not match its scenario")
+        self.turn = 0
+        self.scores = [0, 0]
+        self.carrying = [False] * robotCount
+        self.keyframes = {0: self.keyframe()}
+
+    @staticmethod
+    def load(path: str) -> "Replay":
+        """
+        Loads a recording file written by ActionRecorder.save
+        :param path: file to read
+        """
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version, robotCount, turns, length = HEADER.unpack_from(data)
+        if magic != b"AMZR" or version != VERSION:
+            raise ValueError("not a recording file: " + path)
+        start = HEADER.size + length
+        return Replay(data[HEADER.size:start], data[start:start + turns * robotCount], robotCount)
+
+    @staticmethod
+    def of(recorder: ActionRecorder) -> "Replay":
+        """
+        Returns the replay of a recording in memory (e.g. of a game that is still being played)
+        """
+        return Replay(recorder.scenario, bytes(recorder.actions), recorder.robotCount)
+
+    def keyframe(self) -> tuple:
+        return bytes(self.maze.maze.cells), [(robot.x, robot.y) for robot in self.robots], list(self.carrying), list(self.scores)
+
+    def finished(self) -> bool:
+        return self.turn >= self.turns
+
+    def step(self):
+        """
+        Applies the actions of the next turn
+        """
+        if self.finished():
+            return
+        cells = self.maze.maze.cells
+        y = self.maze.y
+        offset = self.turn * self.robotCount
+        for i, robot in enumerate(self.robots):
+            action = self.actions[offset + i]
+            dx, dy = DELTAS[action & 7]
+            robot.x += dx
+            robot.y += dy
+            if action & PICKUP:
+                cells[robot.x * y + robot.y] = EMPTY
+                self.carrying[i] = True
+            if action & DELIVER:
+                self.scores[self.teams[i]] += 1
+                self.carrying[i] = False
+        self.turn += 1
+        if self.turn % KEYFRAME_INTERVAL == 0 and self.turn not in self.keyframes:
+            self.keyframes[self.turn] = self.keyframe()
+
+    def seek(self, turn: int):
+        """
+        Moves the replay to the state after the given turn, starting from the nearest earlier keyframe
+        Keyframes are taken the first time a replay passes them, so seeking far ahead plays the turns in between once.
+        :param turn: turn to seek to, clamped to 0 .. turns
+        """
+        turn = max(0, min(turn, self.turns))
+        if not self.turn <= turn < self.turn + KEYFRAME_INTERVAL:
+            start = min(turn // KEYFRAME_INTERVAL * KEYFRAME_INTERVAL, max(self.keyframes))
+            if not self.turn <= turn or self.turn < start:
+                cells, positions, carrying, scores = self.keyframes[start]
+                self.maze.maze.cells[:] = cells
+                for robot, (x, y) in zip(self.robots, positions):
+                    robot.x, robot.y = x, y
+                self.carrying[:] = carrying
+                self.scores[:] = scores
+                self.turn = start
+        while self.turn < turn:
+            self.step()
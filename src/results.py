@@ -0,0 +1,122 @@
+"""
+Tally and append-only log of game results.
+
+The log is a JSONL file: the first line describes the run (master seed, number of games, generator, corpus, exploration, decisions),
+every other line is the record of one finished game:
+    {"index": 3, "seed": 1234, "team1Score": 4, "team2Score": 2, "turns": 97, "winner": 1, "wallTime": 0.21}
+winner is 1 or 2 for the winning team and 0 for a draw. Records are written as games finish, so they are not
+in index order. A run that was interrupted is resumed by skipping the indices already in the log.
+"""
+import json
+import os
+import random
+
+RUN_KEYS = ("seed", "runs", "generator", "corpus", "exploration", "decisions")
+
+
+def new_tally() -> dict:
+    return {"team1Win": 0, "team2Win": 0, "draw": 0, "team1Score": 0, "team2Score": 0, "totalTurns": 0}
+
+def add_result(tally: dict, team1Score: int, team2Score: int, turns: int):
+    """
+    Adds the result of one game to the tally
+    """
+    tally["totalTurns"] += turns
+    tally["team1Score"] += team1Score
+    tally["team2Score"] += team2Score
+    if team1Score > team2Score:
+        tally["team1Win"] += 1
+    elif team1Score < team2Score:
+        tally["team2Win"] += 1
+    else:
+        tally["draw"] += 1
+
+def game_record(index: int, seed: int, team1Score: int, team2Score: int, turns: int, wallTime: float) -> dict:
+    """
+    Returns the log record of one game
+    """
+    winner = 1 if team1Score > team2Score else 2 if team2Score > team1Score else 0
+    return {"index": index, "seed": seed, "team1Score": team1Score, "team2Score": team2Score,
+            "turns": turns, "winner": winner, "wallTime": round(wallTime, 6)}
+
+def read_records(path: str):
+    """
+    Yields the game records of the log one by one (constant memory)
+    A last line cut off by an interrupted run is skipped.
+    """
+    with open(path, "rb") as file:
+        file.readline()
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            yield json.loads(line)
+
+def summarize_log(path: str) -> dict:
+    """
+    Returns the tally of all games in the log (see new_tally), reading it in constant memory
+    Besides the totals the summary has the number of games and the shortest and longest game.
+    """
+    tally = new_tally()
+    tally.update({"games": 0, "minTurns": None, "maxTurns": None, "wallTime": 0.0})
+    for record in read_records(path):
+        add_result(tally, record["team1Score"], record["team2Score"], record["turns"])
+        tally["games"] += 1
+        tally["wallTime"] += record["wallTime"]
+        if tally["minTurns"] is None or record["turns"] < tally["minTurns"]:
+            tally["minTurns"] = record["turns"]
+        if tally["maxTurns"] is None or record["turns"] > tally["maxTurns"]:
+            tally["maxTurns"] = record["turns"]
+    return tally
+
+
+class GameLog:
+    """
+    Open game log. Creating it on an existing log resumes the run: done holds the indices of the logged games
+    and a line cut off by an interrupted run is removed, new records are appended.
+    """
+    def __init__(self, path: str, run: dict):
+        """
+        :param path: log file
+        :param run: description of the run (RUN_KEYS), the master seed may be None to take it from an existing log
+            (or to pick a random one for a new log, it is written to the header)
+        """
+        self.path = path
+        self.done = set()
+        self.run = dict(run)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as file:
+                logged = json.loads(file.readline())
+                end = file.tell()
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    self.done.add(json.loads(line)["index"])
+                    end += len(line)
+            if logged.get("seed") is None:
+                raise ValueError("the log %s has no master seed" % path)
+            if self.run["seed"] is None:
+                self.run["seed"] = logged["seed"]
+            for key in RUN_KEYS:
+                if key != "runs" and logged.get(key) != self.run.get(key):
+                    raise ValueError("the log %s belongs to another run (%s %r)" % (path, key, logged.get(key)))
+            self.file = open(path, "r+b")
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            if self.run["seed"] is None:
+                self.run["seed"] = random.randrange(2**32)
+            self.file = open(path, "wb")
+            self.file.write(json.dumps(self.run).encode() + b"\n")
+            self.file.flush()
+
+    def write(self, records: list):
+        """
+        Appends the records and flushes them to the file
+        """
+        for record in records:
+            self.file.write(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+            self.done.add(record["index"])
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
@@ -1,23 +1,163 @@
-import pygame
-from util.consts import RECT_SIZE
-from src.objects import Item, Wall
-from util.helpers import BFSFindZero, optimalPathEstimate, distance
+from src.objects import ITEM, WALL, UNKNOWN
+from src.grid import Grid, Memory
+from util.helpers import BFSFindZero, BFSExplorationField, optimalPathEstimate, distance, cache_lock
+from util import instrumentation
 
 
 
+class Occupancy:
+    """
+    Spatial index of robot positions: number of robots on every occupied cell
+    Robots registered in it keep it up to date when they move
+    """
+    def __init__(self):
+        self.cells = {}
+
+    def add(self, x: int, y: int):
+        self.cells[(x, y)] = self.cells.get((x, y), 0) + 1
+
+    def remove(self, x: int, y: int):
+        count = self.cells[(x, y)] - 1
+        if count:
+            self.cells[(x, y)] = count
+        else:
+            del self.cells[(x, y)]
+
+    def move(self, x: int, y: int, newX: int, newY: int):
+        self.remove(x, y)
+        self.add(newX, newY)
+
+    def copy(self) -> "Occupancy":
+        other = Occupancy()
+        other.cells = dict(self.cells)
+        return other
+
+class ItemRegistry:
+    """
+    Discovered items keyed by position, in the order they were discovered, with a reservation table
+    An item is reserved while a registered robot has it as target or carries it
+    Membership, adding and removing are O(1)
+    """
+    def __init__(self):
+        self.items = {}
+        self.reserved = {}
+
+    def __contains__(self, item: tuple) -> bool:
+        return item in self.items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def add(self, item: tuple):
+        """
+        Adds the item at the end of the discovery order, items already in the registry keep their place
+        """
+        if item not in self.items:
+            self.items[item] = None
+
+    def remove(self, item: tuple):
+        del self.items[item]
+
+    def first(self) -> tuple:
+        """
+        Returns the earliest discovered item or None
+        """
+        return next(iter(self.items), None)
+
+    def reserve(self, item: tuple):
+        if item is not None:
+            self.reserved[item] = self.reserved.get(item, 0) + 1
+
+    def release(self, item: tuple):
+        if item is not None:
+            count = self.reserved[item] - 1
+            if count:
+                self.reserved[item] = count
+            else:
+                del self.reserved[item]
+
+    def last_unreserved(self) -> tuple:
+        """
+        Returns the latest discovered item that is not reserved or None
+        """
+        reserved = self.reserved
+        for item in reversed(self.items):
+            if item not in reserved:
+                return item
+        return None
+
+    def copy(self) -> "ItemRegistry":
+        other = ItemRegistry()
+        other.items = dict(self.items)
+        other.reserved = dict(self.reserved)
+        return other
+
+class ExplorationField:
+    """
+    Exploration flow field of a shared memory: distance of every cell to the closest unknown cell
+    The field is computed at most once per turn (on first use after reset), all robots of the team read their
+    step towards unknown cells from it in O(1), later in the turn it may lag behind the memory by the moves made since.
+    """
+    def __init__(self, memory: Memory):
+        self.memory = memory
+        self.field = None
+
+    def reset(self):
+        """
+        Drops the field, the next step computes it again
+        """
+        self.field = None
+
+    def step(self, x: int, y: int) -> tuple:
+        """
+        Returns the first action (left, right, up, down) that gets closer to unknown cells from x, y or None
+        """
+        field = self.field
+        if field is None:
+            with cache_lock:
+                if self.field is None:
+                    self.field = BFSExplorationField(self.memory)
+                field = self.field
+        memory = self.memory
+        current = field[x * memory.y + y]
+        if current <= 0:
+            return None
+        for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            if validate_coords(x + dx, y + dy, memory) and field[(x + dx) * memory.y + y + dy] == current - 1 \
+                    and memory.get(x + dx, y + dy) != WALL:
+                return dx, dy
+        return None
+
 class Context:
     """
     Context class to hold the state of the game for each team
+    occupancy indexes the positions of context.robots, discovered_items holds their reservations
+    exploration is the exploration flow field of the team if it uses one
     """
     def __init__(self):
         self.robots = []
-        self.discovered_items = []
+        self.discovered_items = ItemRegistry()
         self.retrive_pointX = 0
         self.retrive_pointY = 0
         self.score = 0
+        self.occupancy = Occupancy()
+        self.exploration = None
 
-def validate_coords(x : int, y : int, grid) -> bool:
-    if 0 <= x < len(grid) and 0 <= y < len(grid[0]):
+    def copy(self) -> "Context":
+        """
+        Returns a copy with its own registry and occupancy, robots are left to the team that copies the context
+        """
+        other = Context.__new__(Context)
+        other.__dict__.update(self.__dict__)
+        other.discovered_items = self.discovered_items.copy()
+        other.occupancy = self.occupancy.copy()
+        return other
+
+def validate_coords(x : int, y : int, grid: Grid) -> bool:
+    if 0 <= x < grid.x and 0 <= y < grid.y:
         return True
     return False
 
@@ -31,74 +171,79 @@ class Robot:
         self.y = y
         self.gridX = 0
         self.gridY = 0
-        self.image = pygame.image.load("assets/robot.png") # Image under CC BY 4.0 from https://icon-icons.com/icon/technology-robot/113340
-        self.image = pygame.transform.scale(self.image, (RECT_SIZE, RECT_SIZE))
-        self.rect = self.image.get_rect()
-        self.rect.topleft = (self.x * RECT_SIZE, self.y * RECT_SIZE)
         self.item = None
         self.target = None
+        self.occupancy = None # spatial index the robot is registered in
 
     def moveUP(self):
+        if self.occupancy is not None:
+            self.occupancy.move(self.x, self.y, self.x, self.y - 1)
         self.y -= 1
-        self.rect.y -= RECT_SIZE
     def moveDOWN(self):
+        if self.occupancy is not None:
+            self.occupancy.move(self.x, self.y, self.x, self.y + 1)
         self.y += 1
-        self.rect.y += RECT_SIZE
     def moveLEFT(self):
+        if self.occupancy is not None:
+            self.occupancy.move(self.x, self.y, self.x - 1, self.y)
         self.x -= 1
-        self.rect.x -= RECT_SIZE
     def moveRIGHT(self):
+        if self.occupancy is not None:
+            self.occupancy.move(self.x, self.y, self.x + 1, self.y)
         self.x += 1
-        self.rect.x += RECT_SIZE
 
     def get_pos(self):
         return self.x, self.y
 
-    def draw(self, screen : pygame.Surface):
-        """
-        Draw the robot on the screen
-        :param screen: The screen to draw on
-        """
-        screen.blit(self.image, self.rect)
-    def vision(self, grid : list) -> list:
+    def copy(self) -> "Robot":
         """
-        Returns the 5x5 area around the robot
-        :param grid: The grid to get the vision from
+        Returns a copy of the robot, positions are tuples, so they are shared
+        The copy is still registered in the occupancy of the original, the team copying it registers it in its own
         """
-        vision_area = []
-        for i in range(-2, 3):
-            vision_area.append([])
-            for j in range(-2, 3):
-                if 0 <= self.x + i < len(grid) and 0 <= self.y + j < len(grid[0]):
-                    vision_area[i + 2].append(grid[self.x + i][self.y + j])
-                else:
-                    vision_area[i + 2].append(None)
-        return vision_area
-    def loc_mem_change(self, memory, x, y) -> int:
+        other = Robot.__new__(type(self))
+        other.__dict__.update(self.__dict__)
+        return other
+
+    def loc_mem_change(self, memory: Memory, x, y) -> int:
         """
         Returns the number of undiscovered cells in the 5x5 area around x, y coordinates
+        Inside the memory it is read from the unknown counts the memory maintains
         :param memory: The memory to get the vision from
         :param x: The x coordinate of the robot
         :param y: The y coordinate of the robot
         """
-        vision_area = []
-        for i in range(-2, 3):
-            vision_area.append([])
-            for j in range(-2, 3):
-                if 0 <= x + i < len(memory) and 0 <= y + j < len(memory[0]):
-                    vision_area[i + 2].append(memory[x + i][y + j])
+        if 0 <= x < memory.x and 0 <= y < memory.y:
+            return memory.unknown[x * memory.y + y]
+        cells = memory.cells
         number_of_undiscovered = 0
-        for x in vision_area:
-            for y in x:
-                if y == 0:
+        for i in range(max(x - 2, 0), min(x + 3, memory.x)):
+            base = i * memory.y
+            for j in range(max(y - 2, 0), min(y + 3, memory.y)):
+                if cells[base + j] == UNKNOWN:
                     number_of_undiscovered += 1
         return number_of_undiscovered
 
-    def pickup(self, item : Item, discovered_items : list) -> bool:
+    def gets_closer(self, memory: Memory, x: int, y: int, targetX: int, targetY: int) -> bool:
+        """
+        Returns True if the estimated path to the target is shorter from x, y than from the robot's position
+        Moving closer is only possible if the target can be reached from both positions.
+        :param memory: The memory to estimate the paths in
+        :param x: Possible new x coordinate of the robot
+        :param y: Possible new y coordinate of the robot
+        :param targetX: x coordinate of the target
+        :param targetY: y coordinate of the target
+        """
+        current = optimalPathEstimate(memory, self.x, self.y, targetX, targetY)
+        if current is None:
+            return False
+        estimate = optimalPathEstimate(memory, x, y, targetX, targetY)
+        return estimate is not None and estimate < current
+
+    def pickup(self, item : tuple, discovered_items : ItemRegistry) -> bool:
         """
         Robot picks up an item
-        :param item: The item to pick up
-        :param discovered_items: The list of discovered items
+        :param item: The position of the item to pick up
+        :param discovered_items: The registry of discovered items
         """
         if self.item is None:
             self.item = item
@@ -118,19 +263,22 @@ class Robot:
     def count_closer_robots_in_vision(self, memory, context: Context, newX: int, newY: int) -> int:
         """
         Returns the number of robots in the 5x5 area around newX, newY coordinates that are closer to the newX, newY coordinates than to current robot
+        Only the cells of the area are looked up in context.occupancy
+        The robot itself is never counted (it is closer to its own cell)
         :param memory: The memory to get the vision from
         :param context: The context of the game
         :param newX: Possible new x coordinate of the robot
         :param newY: Possbile new y coordinate of the robot
         """
+        occupied = context.occupancy.cells
+        if not occupied:
+            return 0
         count = 0
         for i in range(-2, 3):
             for j in range(-2, 3):
-                if 0 <= newX + i < len(memory) and 0 <= newY + j < len(memory[0]):
-                    for robot in context.robots:
-                        if robot != self and robot.x == newX + i and robot.y == newY + j:
-                            if distance(newX, newY, newX + i, newY + j) < distance(self.x, self.y, newX + i, newY + j):
-                                count += 1
+                robots = occupied.get((newX + i, newY + j))
+                if robots and distance(newX, newY, newX + i, newY + j) < distance(self.x, self.y, newX + i, newY + j):
+                    count += robots
         return count
 
 class RobotCooperative(Robot):
@@ -138,46 +286,52 @@ class RobotCooperative(Robot):
     RobotCooperative class to represent the cooperative robot (simple cooperative agent)
     Derived from the Robot class
     """
-    def __init__(self, x: int, y: int):
-        super().__init__(x, y)
-        self.image = pygame.image.load("assets/robot.png") # Image under CC BY 4.0 from https://icon-icons.com/icon/technology-robot/113340
-        self.image = pygame.transform.scale(self.image, (RECT_SIZE, RECT_SIZE))
-        self.rect = self.image.get_rect()
-        self.rect.topleft = (self.x * RECT_SIZE, self.y * RECT_SIZE)
-    def updateMemory(self, grid : list, memory : list, context: Context):
+    registry = None # item registry of the team, reserves the target and the carried item of the robot
+
+    @property
+    def target(self) -> tuple:
+        return self._target
+
+    @target.setter
+    def target(self, target: tuple):
+        if self.registry is not None:
+            self.registry.release(self.__dict__.get("_target"))
+            self.registry.reserve(target)
+        self._target = target
+
+    @property
+    def item(self) -> tuple:
+        return self._item
+
+    @item.setter
+    def item(self, item: tuple):
+        if self.registry is not None:
+            self.registry.release(self.__dict__.get("_item"))
+            self.registry.reserve(item)
+        self._item = item
+
+    def updateMemory(self, grid : Grid, memory : Memory, context: Context):
         """
         Updates the memory of the robot by adding new vision area to the memory
         :param grid: The grid to get the vision from
         :param memory: The memory to update
         :param context: The context of the game
         """
-        vision = self.vision(grid)
-        for i in range(len(vision)):
-            for j in range(len(vision[i])):
-                if isinstance(vision[i][j], Item) and vision[i][j] not in context.discovered_items:
-                    #print("discovered item")
-                    context.discovered_items.append(vision[i][j])
-        pos = self.get_pos()
-        for i in range(-2, 3):
-            for j in range(-2, 3):
-                if 0 <= pos[0] + i < len(grid) and 0 <= pos[1] + j < len(grid[0]):
-                    memory[pos[0] + i][pos[1] + j] = vision[i + 2][j + 2]
+        for item in grid.window_positions(ITEM, self.x, self.y):
+            context.discovered_items.add(item)
+        memory.reveal(grid, self.x, self.y)
 
     def get_target(self, context: Context):
         """
         Robot reserves a target from the discovered items
+        Picks the latest discovered item that no robot of the team targets or carries
         :param context: The context of the game
         """
-        for target in context.discovered_items:
-            count = 0
-            for robot in context.robots:
-                if target == robot.item or target == robot.target:
-                    count += 1
-            if count == 0:
-                #print("target found")
-                self.target = target
+        target = context.discovered_items.last_unreserved()
+        if target is not None:
+            self.target = target
 
-    def utility(self, x : int, y : int, memory : list, context: Context):
+    def utility(self, x : int, y : int, memory : Memory, context: Context):
         """
         Utility function for the robot
         :param x: The x coordinate of the robot
@@ -185,30 +339,32 @@ class RobotCooperative(Robot):
         :param memory: The memory to get the vision from
         :param context: The context of the game
         """
+        if instrumentation.stats is not None:
+            instrumentation.stats.count("utility_calls")
         move_score = 0
         discovered = self.loc_mem_change(memory, x, y) # utility from discovering new area
         move_score += discovered
         if x < 0 or x >= self.gridX or y < 0 or y >= self.gridY:
             return -5
-        if isinstance(memory[x][y],Wall):
+        if memory.get(x, y) == WALL:
             return -5
         if self.item is None:
             if self.target is not None:
-                pos = self.target.get_pos()
+                pos = self.target
                 if distance(x, y, pos[0],pos[1]) == 0:
                     move_score += 12
-                elif optimalPathEstimate(memory, self.x, self.y, pos[0], pos[1]) > optimalPathEstimate(memory, x, y, pos[0], pos[1]):
+                elif self.gets_closer(memory, x, y, pos[0], pos[1]):
                     move_score += 8
         if self.item is not None:
             if distance(x, y, context.retrive_pointX, context.retrive_pointY) == 0:
                 move_score += 10
-            elif optimalPathEstimate(memory, self.x, self.y, context.retrive_pointX, context.retrive_pointY) > optimalPathEstimate(memory, x, y, context.retrive_pointX, context.retrive_pointY):
+            elif self.gets_closer(memory, x, y, context.retrive_pointX, context.retrive_pointY):
                 move_score += 7
         move_score -= min(3,self.count_closer_robots_in_vision(memory, context, x, y)) # utility deduction for being close to other robots, max 3
 
         return move_score
 
-    def decide_action(self,grid : list, memory : list, context: Context):
+    def decide_action(self,grid : Grid, memory : Memory, context: Context):
         """
         Decides the action of the robot
         :param grid: The grid to get the vision from
@@ -223,40 +379,58 @@ class RobotCooperative(Robot):
         for action in actions:
             new_x = pos[0] + action[0]
             new_y = pos[1] + action[1]
-            if 0 <= new_x < len(grid) and 0 <= new_y < len(grid[0]):
+            if 0 <= new_x < grid.x and 0 <= new_y < grid.y:
                 utility = self.utility(new_x, new_y, memory,context)
                 if utility > best_utility:
                     best_utility = utility
                     best_action = action
         #print(best_utility)
-        if best_utility <= 0: # check path with bfs
+        if best_utility <= 0 and context.exploration is not None: # step along the team's exploration field
+            if instrumentation.stats is not None:
+                instrumentation.stats.count("fallback_explorations")
+            action = context.exploration.step(pos[0], pos[1])
+            if action is not None:
+                best_action = action
+        elif best_utility <= 0: # check path with bfs
+            if instrumentation.stats is not None:
+                instrumentation.stats.count("fallback_explorations")
             closest_undiscovered = BFSFindZero(memory, pos[0], pos[1])
             if closest_undiscovered is not None:
                 x, y = closest_undiscovered
                 Rx = pos[0]
                 Ry = pos[1]
                 distance = optimalPathEstimate(memory, self.x, self.y, x, y)
-                if validate_coords(Rx - 1, Ry, grid) and optimalPathEstimate(memory,Rx - 1, Ry, x, y) < distance and not isinstance(memory[Rx - 1][Ry], Wall):
-                    best_action = (-1, 0)
-                elif validate_coords(Rx + 1, Ry, grid) and optimalPathEstimate(memory,Rx + 1, Ry, x, y) < distance and not isinstance(memory[Rx + 1][Ry], Wall):
-                    best_action = (1, 0)
-                elif validate_coords(Rx, Ry - 1, grid) and optimalPathEstimate(memory,Rx, Ry - 1, x, y) < distance and not isinstance(memory[Rx][Ry - 1], Wall):
-                    best_action = (0, -1)
-                elif validate_coords(Rx, Ry + 1, grid) and optimalPathEstimate(memory,Rx, Ry + 1, x, y) < distance and not isinstance(memory[Rx][Ry + 1], Wall):
-                    best_action = (0, 1)
+                if distance is not None:
+                    # first neighbour (left, right, up, down) that is closer, walls are not estimated
+                    for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                        if validate_coords(Rx + dx, Ry + dy, grid) and memory.get(Rx + dx, Ry + dy) != WALL:
+                            estimate = optimalPathEstimate(memory, Rx + dx, Ry + dy, x, y)
+                            if estimate is not None and estimate < distance:
+                                best_action = (dx, dy)
+                                break
         if best_utility < -4:
             best_action = None
         #print("best: ",best_utility)
         return best_action
 
-    def move(self, grid: list, memory: list, context: Context):
+    def move(self, grid: Grid, memory: Memory, context: Context):
         """
         Moves the robot in the grid
         :param grid: The grid to move in
         :param memory: The memory to update
         :param context: The context of the game
         """
-        action = self.decide_action(grid, memory, context)
+        return self.act(grid, memory, context, self.decide_action(grid, memory, context))
+
+    def act(self, grid: Grid, memory: Memory, context: Context, action: tuple):
+        """
+        Carries out a decided action: moves the robot, updates the memory, picks up or delivers an item
+        :param grid: The grid to move in
+        :param memory: The memory to update
+        :param context: The context of the game
+        :param action: The action returned by decide_action (possibly decided on an earlier state)
+        :return: The position of the picked up item or None
+        """
         if action:
             if action[0] == -1:
                 self.moveLEFT()
@@ -273,7 +447,7 @@ class RobotCooperative(Robot):
             else:
                 return
 
-        if self.target and memory[self.target.x][self.target.y] != self.target:
+        if self.target and memory.get(self.target[0], self.target[1]) != ITEM:
             context.discovered_items.remove(self.target)
             self.target = None
 
@@ -282,7 +456,7 @@ class RobotCooperative(Robot):
             self.get_target(context)
 
         if self.target is not None:
-            if self.target.x == self.x and self.target.y == self.y:
+            if self.target == (self.x, self.y):
                 #print("picked up item")
                 self.pickup(self.target, context.discovered_items)
                 self.target = None
@@ -301,36 +475,31 @@ class RobotSelfInterested(Robot):
     """
     def __init__(self, x: int, y: int):
         super().__init__(x, y)
-        self.image = pygame.image.load("assets/robot2.png") # Image under CC BY 4.0 (colors inverted) from https://icon-icons.com/icon/technology-robot/113340
-        self.image = pygame.transform.scale(self.image, (RECT_SIZE, RECT_SIZE))
-        self.rect = self.image.get_rect()
-        self.rect.topleft = (self.x * RECT_SIZE, self.y * RECT_SIZE)
-        self.discovered_items = []
-    def updateMemory(self, grid: list):
+        self.discovered_items = ItemRegistry()
+
+    def copy(self) -> "RobotSelfInterested":
+        other = super().copy()
+        other.discovered_items = self.discovered_items.copy()
+        if "memory" in self.__dict__:
+            other.memory = self.memory.copy()
+        return other
+    def updateMemory(self, grid: Grid):
         """
         Updates the memory of the robot by adding new vision area to the memory
         Uses does not share the memory with other robots
         :param grid: The grid to get the vision from
         """
-        vision = self.vision(grid)
-        for i in range(len(vision)):
-            for j in range(len(vision[i])):
-                if isinstance(vision[i][j], Item) and vision[i][j] not in self.discovered_items:
-                    #print("discovered item")
-                    self.discovered_items.append(vision[i][j])
-        pos = self.get_pos()
-        for i in range(-2, 3):
-            for j in range(-2, 3):
-                if 0 <= pos[0] + i < len(grid) and 0 <= pos[1] + j < len(grid[0]):
-                    self.memory[pos[0] + i][pos[1] + j] = vision[i + 2][j + 2]
+        for item in grid.window_positions(ITEM, self.x, self.y):
+            self.discovered_items.add(item)
+        self.memory.reveal(grid, self.x, self.y)
 
 
-    def initMemory(self,grid: list):
+    def initMemory(self,grid: Grid):
         """
         Initializes the memory of the robot
         :param grid: The grid to get the vision from
         """
-        self.memory = [[0 for _ in range(self.gridY)] for _ in range(self.gridX)]
+        self.memory = Memory(self.gridX, self.gridY)
         self.updateMemory(grid)
         self.get_target()
 
@@ -341,24 +510,26 @@ class RobotSelfInterested(Robot):
         :param y: The y coordinate of the robot
         :param context: The context of the game
         """
+        if instrumentation.stats is not None:
+            instrumentation.stats.count("utility_calls")
         move_score = 0
         discovered = self.loc_mem_change(self.memory, x, y)
         move_score += discovered // 2
         if x < 0 or x >= self.gridX or y < 0 or y >= self.gridY:
             return -1
-        if isinstance(self.memory[x][y],Wall):
+        if self.memory.get(x, y) == WALL:
             return -5
         if self.item is None:
             if self.target is not None:
-                pos = self.target.get_pos()
+                pos = self.target
                 if distance(x, y, pos[0],pos[1]) == 0:
                     move_score += 12
-                elif optimalPathEstimate(self.memory, self.x, self.y, pos[0], pos[1]) > optimalPathEstimate(self.memory, x, y, pos[0], pos[1]):
+                elif self.gets_closer(self.memory, x, y, pos[0], pos[1]):
                     move_score += 4
         if self.item is not None:
             if distance(x, y, context.retrive_pointX, context.retrive_pointY) == 0:
                 move_score += 10
-            elif optimalPathEstimate(self.memory, self.x, self.y, context.retrive_pointX, context.retrive_pointY) > optimalPathEstimate(self.memory, x, y, context.retrive_pointX, context.retrive_pointY):
+            elif self.gets_closer(self.memory, x, y, context.retrive_pointX, context.retrive_pointY):
                 move_score += 7
 
         move_score -= min(3,self.count_closer_robots_in_vision(self.memory, context, x, y)) # utility deduction for being close to other robots, max 3
@@ -380,45 +551,54 @@ class RobotSelfInterested(Robot):
         for action in actions:
             new_x = pos[0] + action[0]
             new_y = pos[1] + action[1]
-            if 0 <= new_x < len(grid) and 0 <= new_y < len(grid[0]):
+            if 0 <= new_x < grid.x and 0 <= new_y < grid.y:
                 utility = self.utility(new_x, new_y,context)
                 if utility > best_utility:
                     best_utility = utility
                     best_action = action
 
         if best_utility <= 0:
+            if instrumentation.stats is not None:
+                instrumentation.stats.count("fallback_explorations")
             closest_undiscovered = BFSFindZero(self.memory, pos[0], pos[1])
             if closest_undiscovered is not None:
                 x, y = closest_undiscovered
                 Rx = pos[0]
                 Ry = pos[1]
                 distance = optimalPathEstimate(self.memory, self.x, self.y, x, y)
-                if  validate_coords(Rx - 1, Ry, grid) and optimalPathEstimate(self.memory,Rx - 1, Ry, x, y) < distance and not isinstance(self.memory[Rx - 1][Ry], Wall):
-                    best_action = (-1, 0)
-                elif  validate_coords(Rx + 1, Ry, grid) and optimalPathEstimate(self.memory,Rx + 1, Ry, x, y) < distance and not isinstance(self.memory[Rx + 1][Ry], Wall):
-                    best_action = (1, 0)
-                elif validate_coords(Rx, Ry - 1, grid) and optimalPathEstimate(self.memory,Rx, Ry - 1, x, y) < distance and not isinstance(self.memory[Rx][Ry - 1], Wall):
-                    best_action = (0, -1)
-                elif validate_coords(Rx, Ry + 1, grid) and optimalPathEstimate(self.memory,Rx, Ry + 1, x, y) < distance and not isinstance(self.memory[Rx][Ry + 1], Wall):
-                    best_action = (0, 1)
+                if distance is not None:
+                    # first neighbour (left, right, up, down) that is closer, walls are not estimated
+                    for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                        if validate_coords(Rx + dx, Ry + dy, grid) and self.memory.get(Rx + dx, Ry + dy) != WALL:
+                            estimate = optimalPathEstimate(self.memory, Rx + dx, Ry + dy, x, y)
+                            if estimate is not None and estimate < distance:
+                                best_action = (dx, dy)
+                                break
             if best_utility < -4:
                 best_action = None
         return best_action
 
     def get_target(self):
         """
-        Robot picks a target from his discovered items
+        Robot picks a target from his discovered items (the earliest discovered one)
         """
-        for target in self.discovered_items:
+        target = self.discovered_items.first()
+        if target is not None:
             self.target = target
-            break
 
 
-    def move(self, grid: list, context: Context):
+    def move(self, grid: Grid, context: Context):
         """
         Moves the robot in the grid
         """
-        action = self.decide_action(grid,context)
+        return self.act(grid, context, self.decide_action(grid, context))
+
+    def act(self, grid: Grid, context: Context, action: tuple):
+        """
+        Carries out a decided action: moves the robot, updates its memory, picks up or delivers an item
+        :param action: The action returned by decide_action (possibly decided on an earlier state)
+        :return: The position of the picked up item or None
+        """
         if action:
             if action[0] == -1:
                 self.moveLEFT()
@@ -434,7 +614,7 @@ class RobotSelfInterested(Robot):
                 self.updateMemory(grid)
             else:
                 return
-        if self.target and self.memory[self.target.x][self.target.y] != self.target:
+        if self.target and self.memory.get(self.target[0], self.target[1]) != ITEM:
             self.discovered_items.remove(self.target)
             self.target = None
         #print(self.item, self.target)
@@ -442,7 +622,7 @@ class RobotSelfInterested(Robot):
             self.get_target()
 
         if self.target is not None:
-            if self.target.x == self.x and self.target.y == self.y and grid[self.x][self.y] == self.target:
+            if self.target == (self.x, self.y) and grid.get(self.x, self.y) == ITEM:
                 self.pickup(self.target, self.discovered_items)
                 self.target = None
                 return self.x, self.y
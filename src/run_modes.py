@@ -1,142 +1,301 @@
-import pygame
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.game import Game
+from src.team import DecisionPool
 from src.maze import Maze
-from src.objects import Empty
-from src.robot import RobotCooperative, RobotSelfInterested
-from src.team import CooperativeTeam, SelfInterestedTeam
-from util.consts import MAZE_X, MAZE_Y, RECT_SIZE, ITEM_COUNT, AUTOMOVE_DELAY, ROBOT_COUNT
+from src.scenario import Corpus, write_corpus
+from src.replay import ActionRecorder, Replay, KEYFRAME_INTERVAL
+from src.results import GameLog, game_record, summarize_log, new_tally, add_result
+from src.objects import EMPTY
+from util.consts import RECT_SIZE, AUTOMOVE_DELAY, GENERATOR, EXPLORATION, DECISIONS, MAZE_X, MAZE_Y, ITEM_COUNT, ROBOT_COUNT
+from util import instrumentation
 
 
-def pygame_simulation():
+def pygame_simulation(stats_path: str = None, generator: str = GENERATOR, tick_rate: float = 1 / AUTOMOVE_DELAY, record_path: str = None, exploration: str = EXPLORATION, decisions: str = DECISIONS, decision_workers: int = 0):
     """
     Runs a pygame simulation
+    The game is played by a SimulationClock in its own thread, the window is redrawn at 60 frames per second
+    from the state between two turns. Keys: space plays one turn, A starts / pauses automatic play,
+    F switches automatic play between tick_rate and fast-forward, left / right arrow show the memory of team 1 / 2,
+    escape hides it.
+    :param stats_path: if given, the game is instrumented and the stats are written to this JSON file
+    :param generator: name of the maze generator (see src.generators)
+    :param tick_rate: turns per second of automatic play
+    :param record_path: if given, the game is recorded and saved to this file when the window is closed (see src.replay)
+    :param exploration: exploration of the cooperative team, "nearest" or "field" (see CooperativeTeam)
+    :param decisions: team turns, "sequential" or "simultaneous" (see CooperativeTeam)
+    :param decision_workers: if given, simultaneous turns are decided in this many worker processes (see DecisionPool)
     """
-    maze = Maze(MAZE_X, MAZE_Y)
+    # pygame is only needed here, the simulation itself runs without it
+    import pygame
+    from src.render import MazeView
+    from src.clock import SimulationClock
 
-    maze.generate(itemCount=ITEM_COUNT, robotCount=ROBOT_COUNT//2)
-    team1 = CooperativeTeam(maze.maze, maze.deliveryPoints[0][0], maze.deliveryPoints[0][1])
-    team2 = SelfInterestedTeam(maze.maze, maze.deliveryPoints[1][0], maze.deliveryPoints[1][1])
-    for i in maze.robots:
-        if isinstance(i, RobotCooperative):
-            team1.add_member(i)
-        elif isinstance(i, RobotSelfInterested):
-            team2.add_member(i)
-
-    team1.initMemory(maze.x, maze.y)
-    i = 0
-    for point in maze.deliveryPoints:
-        if i % 2 == 0:
-            maze.maze[point[0]][point[1]].isDeliveryPoint1 = True
-        else:
-            maze.maze[point[0]][point[1]].isDeliveryPoint2 = True
-        i += 1
+    if stats_path:
+        instrumentation.enable()
+    pool = DecisionPool(decision_workers) if decision_workers else None
+    game = Game(generator=generator, exploration=exploration, decisions=decisions, pool=pool)
+    recorder = ActionRecorder(game) if record_path else None
+    maze = game.maze
+    team1 = game.team1
+    team2 = game.team2
+    memory_overlay = bytearray(maze.x * maze.y)
     pygame.init()
-    screen = pygame.display.set_mode((MAZE_X * RECT_SIZE, MAZE_Y * RECT_SIZE))
+    screen = pygame.display.set_mode((maze.x * RECT_SIZE, maze.y * RECT_SIZE))
     clock = pygame.time.Clock()
-
+    view = MazeView(screen, maze)
+    view.draw(memory_overlay)
+    simulation = SimulationClock(game, tick_rate)
+    simulation.start()
 
     running = True
-    automove = False
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
-                    team1.turn()
-                    team2.turn()
+                    simulation.step()
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_LEFT: # display the memory of team1
-                    for i in range(maze.x):
-                        for j in range(maze.y ):
-                            if isinstance(team1.memory[i][j], Empty):
-                                maze.maze[i][j].inmemory = True
+                    with simulation.state():
+                        cells = team1.memory.cells
+                        for i in range(len(cells)):
+                            if cells[i] == EMPTY:
+                                memory_overlay[i] = 1
 
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_a:
-                    automove = not automove
+                    simulation.toggle()
+                if event.key == pygame.K_f:
+                    simulation.toggle_fast()
             if event.type == pygame.KEYUP:
                 if event.key == pygame.K_ESCAPE: # toggle off memory display
-                    for i in range(maze.x):
-                        for j in range(maze.y ):
-                            if isinstance(team1.memory[i][j], Empty):
-                                maze.maze[i][j].inmemory = False
-                    for i in range(maze.x):
-                        for j in range(maze.y ):
-                            for k in range(len(team2.members)):
-                                if isinstance(team2.members[k].memory[i][j], Empty):
-                                    maze.maze[i][j].inmemory = False
+                    memory_overlay[:] = bytes(len(memory_overlay))
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_RIGHT: # display combined team2 memory
-                    for i in range(maze.x):
-                        for j in range(maze.y ):
-                            for k in range(len(team2.members)):
-                                if isinstance(team2.members[k].memory[i][j], Empty):
-                                    maze.maze[i][j].inmemory = True
-        if team1.context.score + team2.context.score == ITEM_COUNT:
-            running = False
-        if automove and running:
-            team1.turn()
-            team2.turn()
-            # wait for AUTOMOVE_DELAY seconds
-            pygame.time.delay(int(AUTOMOVE_DELAY * 1000))
-
-        screen.fill((255, 255, 255))
-        maze.draw(screen)
-        pygame.display.flip()
+                    with simulation.state():
+                        for member in team2.members:
+                            cells = member.memory.cells
+                            for i in range(len(cells)):
+                                if cells[i] == EMPTY:
+                                    memory_overlay[i] = 1
+        with simulation.state():
+            if game.finished():
+                running = False
+            view.update(memory_overlay)
         clock.tick(60)
+    simulation.stop()
     pygame.quit()
+    if pool is not None:
+        pool.close()
     print("Team 1: ", team1.getScore())
     print("Team 2: ", team2.getScore())
+    if recorder is not None:
+        recorder.save(record_path)
+    if stats_path:
+        instrumentation.disable().export(stats_path, mode="pygame", generator=generator, exploration=exploration, decisions=decisions, decision_workers=decision_workers, turns=game.turns, scores=[team1.getScore(), team2.getScore()])
 
-def team_winrate(runs: int):
+def replay_simulation(path: str, tick_rate: float = 1 / AUTOMOVE_DELAY):
     """
-    Runs the simulation runs-times and returns wins for both teams, draws, cumulative score and total turns of the simulation
+    Shows a recorded game in pygame, the recorded actions are applied without any decision-making
+    Keys: space / backspace go one turn forward / back, A starts / pauses automatic play at tick_rate turns per second,
+    right / left arrow jump KEYFRAME_INTERVAL turns forward / back, home / end jump to the start / end of the game.
+    :param path: recording file (see src.replay)
+    :param tick_rate: turns per second of automatic play
+    """
+    import pygame
+    from src.render import MazeView
+
+    replay = Replay.load(path)
+    maze = replay.maze
+    pygame.init()
+    screen = pygame.display.set_mode((maze.x * RECT_SIZE, maze.y * RECT_SIZE))
+    pygame.display.set_caption("Replay")
+    clock = pygame.time.Clock()
+    view = MazeView(screen, maze)
+    view.draw()
+    jumps = {
+        pygame.K_BACKSPACE: lambda: replay.turn - 1,
+        pygame.K_RIGHT: lambda: replay.turn + KEYFRAME_INTERVAL,
+        pygame.K_LEFT: lambda: replay.turn - KEYFRAME_INTERVAL,
+        pygame.K_HOME: lambda: 0,
+        pygame.K_END: lambda: replay.turns,
+    }
+
+    running = True
+    automove = False
+    due = 0.0
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    replay.step()
+                elif event.key == pygame.K_a:
+                    automove = not automove
+                    due = 0.0
+                elif event.key in jumps:
+                    replay.seek(jumps[event.key]())
+                    # items come back when seeking back, so the whole maze is drawn again
+                    view.draw()
+        elapsed = clock.tick(60) / 1000
+        if automove:
+            due += elapsed * tick_rate
+            while due >= 1 and not replay.finished():
+                replay.step()
+                due -= 1
+        view.update()
+        pygame.display.set_caption("Replay - turn %d / %d - %d : %d" % (replay.turn, replay.turns, replay.scores[0], replay.scores[1]))
+    pygame.quit()
+
+def derive_seed(master_seed: int, index: int) -> int:
+    """
+    Returns the seed of the index-th game of a run with the given master seed
     """
-    team1Win = 0
-    team2Win = 0
-    draw = 0
-    team1Score = 0
-    team2Score = 0
-    totalTurns = 0
-    for i in range(runs):
-        maze = Maze(MAZE_X, MAZE_Y)
+    return (master_seed * 0x9E3779B97F4A7C15 + index) % 2**64
 
-        maze.generate(itemCount=ITEM_COUNT, robotCount=ROBOT_COUNT//2)
-        team1 = CooperativeTeam(maze.maze, maze.deliveryPoints[0][0], maze.deliveryPoints[0][1])
-        team2 = SelfInterestedTeam(maze.maze, maze.deliveryPoints[1][0], maze.deliveryPoints[1][1])
-        for i in maze.robots:
-            if isinstance(i, RobotCooperative):
-                team1.add_member(i)
-            elif isinstance(i, RobotSelfInterested):
-                team2.add_member(i)
+def play_games(master_seed: int, indices: range, instrument: bool = False, generator: str = GENERATOR, corpus: str = None, records: bool = False, exploration: str = EXPLORATION, decisions: str = DECISIONS, decision_workers: int = 0) -> dict:
+    """
+    Plays the games with the given indices and returns their tally
+    Every game uses its own random.Random seeded with derive_seed, so the result does not depend on which process plays it
+    :param master_seed: master seed of the run
+    :param indices: indices of the games to play
+    :param instrument: if True, the games are instrumented and the stats are added to the tally under "stats"
+    :param generator: name of the maze generator (see src.generators)
+    :param corpus: if given, the games replay the scenarios with these indices from this corpus file instead of generating mazes
+    :param records: if True, the log record of every game (see src.results) is added to the tally under "records"
+    :param exploration: exploration of the cooperative team, "nearest" or "field" (see CooperativeTeam)
+    :param decisions: team turns, "sequential" or "simultaneous" (see CooperativeTeam)
+    :param decision_workers: if given, simultaneous turns are decided in this many worker processes (see DecisionPool),
+        the pool is started by every process playing games
+    """
+    tally = new_tally()
+    if records:
+        tally["records"] = []
+    scenarios = Corpus(corpus) if corpus else None
+    pool = DecisionPool(decision_workers) if decision_workers else None
+    if instrument:
+        instrumentation.enable()
+    for index in indices:
+        start = time.perf_counter()
+        if scenarios is None:
+            game = Game(random.Random(derive_seed(master_seed, index)), generator=generator, exploration=exploration, decisions=decisions, pool=pool)
+        else:
+            game = Game(maze=scenarios[index], exploration=exploration, decisions=decisions, pool=pool)
+        game.play()
+        add_result(tally, game.team1.getScore(), game.team2.getScore(), game.turns)
+        if records:
+            seed = derive_seed(master_seed, index) if scenarios is None else game.maze.seed
+            tally["records"].append(game_record(index, seed, game.team1.getScore(), game.team2.getScore(), game.turns, time.perf_counter() - start))
+    if pool is not None:
+        pool.close()
+    if instrument:
+        tally["stats"] = instrumentation.disable().to_dict()
+    return tally
 
-        team1.initMemory(maze.x, maze.y)
-        i = 0
-        for point in maze.deliveryPoints:
-            if i % 2 == 0:
-                maze.maze[point[0]][point[1]].isDeliveryPoint1 = True
-            else:
-                maze.maze[point[0]][point[1]].isDeliveryPoint2 = True
-            i += 1
-        while True:
-            totalTurns += 1
-            team1.turn()
-            team2.turn()
-            if team1.context.score + team2.context.score == ITEM_COUNT:
-                team1Score += team1.getScore()
-                team2Score += team2.getScore()
-                if team1.getScore() > team2.getScore():
-                    team1Win += 1
-                elif team1.getScore() < team2.getScore():
-                    team2Win += 1
-                else:
-                    draw += 1
-                break
-    print("Team 1 wins: ", team1Win)
-    print("Team 2 wins: ", team2Win)
-    print("Draw: ", draw)
-    print("Team 1 Score: ", team1Score)
-    print("Team 2 Score: ", team2Score)
-    print("Total Turns: ", totalTurns)
+def team_winrate(runs: int, workers: int = 1, seed: int = None, stats_path: str = None, generator: str = GENERATOR, corpus: str = None, log_path: str = None, exploration: str = EXPLORATION, decisions: str = DECISIONS, decision_workers: int = 0):
+    """
+    Runs the simulation runs-times and returns wins for both teams, draws, cumulative score and total turns of the simulation
+    :param runs: number of games to play
+    :param workers: number of worker processes, 1 plays all games in this process
+    :param seed: master seed, a random one is picked (and printed) if not given
+    :param stats_path: if given, the games are instrumented and the stats of all games are written to this JSON file
+    :param generator: name of the maze generator (see src.generators)
+    :param corpus: if given, the games replay the first runs scenarios of this corpus file (see src.scenario) instead of generating mazes
+    :param log_path: if given, a record of every game is appended to this log as soon as the game ends (see src.results),
+        games already in the log are not played again and the statistics are computed from the whole log
+    :param exploration: exploration of the cooperative team, "nearest" or "field" (see CooperativeTeam)
+    :param decisions: team turns, "sequential" or "simultaneous" (see CooperativeTeam)
+    :param decision_workers: if given, simultaneous turns are decided in this many worker processes per game process
+        (see DecisionPool), the results do not depend on it
+    """
+    if corpus and runs > len(Corpus(corpus)):
+        raise ValueError("the corpus has less than %d scenarios" % runs)
+    log = None
+    if log_path:
+        log = GameLog(log_path, {"seed": seed, "runs": runs, "generator": generator, "corpus": corpus, "exploration": exploration, "decisions": decisions})
+        seed = log.run["seed"]
+    if seed is None:
+        seed = random.randrange(2**32)
+    indices = [index for index in range(runs) if log is None or index not in log.done]
+    extra = [bool(stats_path), generator, corpus, log is not None, exploration, decisions, decision_workers]
+    if log is not None:
+        # every game is logged as soon as it ends, so an interrupted run loses only the games being played
+        size = 1
+    elif workers > 1:
+        # contiguous chunks, a few per worker to even out long games
+        size = max(1, len(indices) // (workers * 4))
+    else:
+        size = max(1, len(indices))
+    chunks = [indices[start:start + size] for start in range(0, len(indices), size)]
+    tally = new_tally()
+    stats = instrumentation.Stats()
+    for part in play_chunks(play_games, seed, chunks, extra, workers):
+        for key in tally:
+            tally[key] += part[key]
+        if "stats" in part:
+            stats.merge(part["stats"])
+        if log is not None:
+            log.write(part["records"])
+    if log is not None:
+        log.close()
+        tally = summarize_log(log_path)
+    if corpus:
+        print("Corpus: ", corpus)
+    else:
+        print("Seed: ", seed)
+    print("Team 1 wins: ", tally["team1Win"])
+    print("Team 2 wins: ", tally["team2Win"])
+    print("Draw: ", tally["draw"])
+    print("Team 1 Score: ", tally["team1Score"])
+    print("Team 2 Score: ", tally["team2Score"])
+    print("Total Turns: ", tally["totalTurns"])
+    if stats_path:
+        tally["stats"] = stats.to_dict()
+        if corpus:
+            # the games replay the corpus, the seed does not matter
+            stats.export(stats_path, mode="run", runs=runs, workers=workers, corpus=corpus, exploration=exploration, decisions=decisions, decision_workers=decision_workers)
+        else:
+            stats.export(stats_path, mode="run", seed=seed, runs=runs, workers=workers, generator=generator, exploration=exploration, decisions=decisions, decision_workers=decision_workers)
+    return tally
 
+def play_chunks(play, seed: int, chunks: list, extra: list, workers: int):
+    """
+    Plays the chunks of game indices and yields the tally of every chunk as soon as it is played
+    :param play: play_games or another function called as play(seed, chunk, *extra)
+    :param seed: master seed of the run
+    :param chunks: lists of game indices (or whatever play takes)
+    :param extra: further arguments of play
+    :param workers: number of worker processes, 1 plays the chunks in this process
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield play(seed, chunk, *extra)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play, seed, chunk, *extra) for chunk in chunks]
+        for future in as_completed(futures):
+            yield future.result()
 
+def save_corpus(path: str, runs: int, seed: int = None, generator: str = GENERATOR):
+    """
+    Generates the mazes of runs games exactly like team_winrate does and saves them as a scenario corpus
+    :param path: corpus file to write
+    :param runs: number of scenarios
+    :param seed: master seed, a random one is picked (and printed) if not given
+    :param generator: name of the maze generator (see src.generators)
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+    def mazes():
+        for index in range(runs):
+            maze = Maze(MAZE_X, MAZE_Y)
+            maze.seed = derive_seed(seed, index)
+            maze.generate(itemCount=ITEM_COUNT, robotCount=ROBOT_COUNT // 2, rng=random.Random(maze.seed), generator=generator)
+            yield maze
+    count = write_corpus(path, mazes())
+    print("Seed: ", seed)
+    print("Scenarios saved: ", count)
@@ -0,0 +1,126 @@
+"""
+Compact binary scenario format and memory-mapped scenario corpora.
+
+A scenario is a generated maze before the game starts. Its record (little-endian) is:
+    header    magic b"AMZS", version u16, x u32, y u32, item count u32, robot count u32, seed u64 (NO_SEED if unknown)
+    grid      x * y cell codes, one byte per cell in Grid order (index = x * y_size + y)
+    items     item count * (x u32, y u32)
+    delivery  2 * (x u32, y u32)
+    robots    robot count * (kind u8, x u32, y u32), kind 0 is cooperative, 1 is self-interested
+A corpus file holds scenario records back to back, followed by the offsets of the records (count + 1 u64)
+and a trailer: magic b"AMZC", version u16, count u32, position of the offsets u64.
+"""
+import mmap
+import struct
+from src.maze import Maze
+from src.objects import ITEM
+from src.robot import RobotCooperative, RobotSelfInterested
+
+VERSION = 1
+NO_SEED = 2**64 - 1
+HEADER = struct.Struct("<4sHIIIIQ")
+POINT = struct.Struct("<II")
+ROBOT = struct.Struct("<BII")
+OFFSET = struct.Struct("<Q")
+TRAILER = struct.Struct("<4sHIQ")
+ROBOT_KINDS = (RobotCooperative, RobotSelfInterested)
+
+
+def pack_maze(maze: Maze) -> bytes:
+    """
+    Returns the scenario record of the maze
+    """
+    items = maze.maze.positions(ITEM)
+    seed = NO_SEED if maze.seed is None else maze.seed
+    parts = [HEADER.pack(b"AMZS", VERSION, maze.x, maze.y, len(items), len(maze.robots), seed), bytes(maze.maze.cells)]
+    parts += [POINT.pack(x, y) for x, y in items]
+    parts += [POINT.pack(x, y) for x, y in maze.deliveryPoints[:2]]
+    parts += [ROBOT.pack(isinstance(robot, RobotSelfInterested), robot.x, robot.y) for robot in maze.robots]
+    return b"".join(parts)
+
+def unpack_maze(buffer) -> Maze:
+    """
+    Returns a new maze read from a scenario record
+    :param buffer: bytes-like object starting with the record
+    """
+    magic, version, x, y, itemCount, robotCount, seed = HEADER.unpack_from(buffer)
+    if magic != b"AMZS" or version != VERSION:
+        raise ValueError("not a scenario record")
+    maze = Maze(x, y)
+    maze.seed = None if seed == NO_SEED else seed
+    maze.itemCount = itemCount
+    offset = HEADER.size
+    maze.maze.cells[:] = buffer[offset:offset + x * y]
+    offset += x * y
+    for _ in range(itemCount):
+        ix, iy = POINT.unpack_from(buffer, offset)
+        maze.maze.set(ix, iy, ITEM)
+        offset += POINT.size
+    for _ in range(2):
+        maze.deliveryPoints.append(POINT.unpack_from(buffer, offset))
+        offset += POINT.size
+    for _ in range(robotCount):
+        kind, rx, ry = ROBOT.unpack_from(buffer, offset)
+        maze.add_robot(ROBOT_KINDS[kind](rx, ry))
+        offset += ROBOT.size
+    return maze
+
+def write_corpus(path: str, mazes) -> int:
+    """
+    Writes the mazes as a corpus file and returns their number
+    The mazes are written one by one, so a generator of mazes is never held in memory at once
+    :param path: file to write
+    :param mazes: iterable of mazes
+    """
+    offsets = [0]
+    with open(path, "wb") as file:
+        for maze in mazes:
+            offsets.append(offsets[-1] + file.write(pack_maze(maze)))
+        for offset in offsets:
+            file.write(OFFSET.pack(offset))
+        file.write(TRAILER.pack(b"AMZC", VERSION, len(offsets) - 1, offsets[-1]))
+    return len(offsets) - 1
+
+
+class Corpus:
+    """
+    Read-only view of a corpus file.
+    The file is memory-mapped, so processes reading the same corpus share its pages, and scenarios are only
+    decoded when they are accessed. Slicing returns a corpus with a subset of the scenarios that shares the mapping,
+    indexing returns a new Maze. A pickled corpus only holds the path and the indices and maps the file again.
+    """
+    def __init__(self, path: str, indices: range = None):
+        """
+        :param path: corpus file
+        :param indices: scenarios of the file in this corpus, all of them if not given
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, self.table = TRAILER.unpack_from(self.map, len(self.map) - TRAILER.size)
+        if magic != b"AMZC" or version != VERSION:
+            raise ValueError("not a corpus file: " + path)
+        self.indices = range(count) if indices is None else indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            view = Corpus.__new__(Corpus)
+            view.__dict__.update(self.__dict__)
+            view.indices = self.indices[key]
+            return view
+        index = self.indices[key]
+        start, end = struct.unpack_from("<QQ", self.map, self.table + index * OFFSET.size)
+        return unpack_maze(self.map[start:end])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getstate__(self) -> dict:
+        return {"path": self.path, "indices": self.indices}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["path"], state["indices"])
@@ -1,5 +1,86 @@
-from src.robot import RobotCooperative, RobotSelfInterested, Context
-from src.objects import Empty
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from src.robot import RobotCooperative, RobotSelfInterested, Context, ExplorationField
+from src.objects import EMPTY
+from src.grid import Grid, Memory
+from util import instrumentation
+from util.consts import EXPLORATION, DECISIONS
+
+
+def decide_cooperative(members: list, grid: Grid, memory: Memory, context: Context) -> list:
+    """
+    Returns the actions the cooperative robots decide on the given state
+    The game state is not changed, only the caches of the memory and the exploration field are filled (under cache_lock).
+    """
+    return [member.decide_action(grid, memory, context) for member in members]
+
+def decide_self_interested(members: list, grid: Grid, context: Context) -> list:
+    """
+    Returns the actions the self-interested robots decide on the given state (and their own memories)
+    The game state is not changed, only the caches of the memories are filled (under cache_lock).
+    """
+    return [member.decide_action(grid, context) for member in members]
+
+def decide_instrumented(decide, instrument: bool, members: list, *state) -> tuple:
+    """
+    Runs decide in a worker process and returns the actions with the stats collected meanwhile (None if instrument is False)
+    """
+    if not instrument:
+        return decide(members, *state), None
+    instrumentation.enable()
+    try:
+        actions = decide(members, *state)
+    finally:
+        stats = instrumentation.disable()
+    return actions, stats.to_dict()
+
+
+class DecisionPool:
+    """
+    Worker processes (or threads) deciding the actions of team members in parallel in simultaneous team turns.
+    The members are split into one chunk per worker, a worker process decides its chunk on a pickled copy of the team state
+    and sends back the stats it collected when instrumentation is enabled.
+    Threads share the state and the stats, the caches they fill while deciding are guarded by util.helpers.cache_lock.
+    They only run in parallel on an interpreter without the GIL.
+    """
+    def __init__(self, workers: int, threads: bool = False):
+        """
+        :param workers: number of workers
+        :param threads: use a thread pool instead of a process pool
+        """
+        self.workers = workers
+        self.threads = threads
+        self.executor = (ThreadPoolExecutor if threads else ProcessPoolExecutor)(max_workers=workers)
+
+    def decide(self, decide, members: list, *state) -> list:
+        """
+        Returns the actions of the members in member order
+        :param decide: decide_cooperative or decide_self_interested
+        :param members: members to decide for
+        :param state: rest of the arguments of decide
+        """
+        size = -(-len(members) // self.workers)
+        chunks = [members[start:start + size] for start in range(0, len(members), size)]
+        if self.threads:
+            futures = [self.executor.submit(decide, chunk, *state) for chunk in chunks]
+            return [action for future in futures for action in future.result()]
+        stats = instrumentation.stats
+        futures = [self.executor.submit(decide_instrumented, decide, stats is not None, chunk, *state) for chunk in chunks]
+        actions = []
+        for future in futures:
+            chunk_actions, chunk_stats = future.result()
+            actions += chunk_actions
+            if chunk_stats is not None:
+                stats.merge(chunk_stats)
+        return actions
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 
 
@@ -7,14 +88,28 @@ class CooperativeTeam:
     """
     This class represents a team of cooperative robots.
     """
-    def __init__(self, grid: list, retrive_pointX: int, retrive_pointY: int):
+    def __init__(self, grid: Grid, retrive_pointX: int, retrive_pointY: int, exploration: str = EXPLORATION, decisions: str = DECISIONS, pool: DecisionPool = None):
+        """
+        :param exploration: "nearest" - a robot with nothing better to do heads for its own closest unknown cell,
+            "field" - it steps along an exploration flow field the team computes once per turn
+        :param decisions: "sequential" - every robot decides and moves in turn, seeing the moves of the robots before it,
+            "simultaneous" - all robots decide on the state before the turn, then they move in member order
+        :param pool: pool deciding the actions of simultaneous turns in parallel, None decides them in this thread
+        """
+        if exploration not in ("nearest", "field"):
+            raise ValueError("unknown exploration: " + exploration)
+        if decisions not in ("sequential", "simultaneous"):
+            raise ValueError("unknown decisions: " + decisions)
         self.members : list[RobotCooperative] = []
-        self.memory = []
+        self.exploration = exploration
+        self.decisions = decisions
+        self.pool = pool
+        self.memory = None
         self.grid = grid
+        self.recorder = None # src.replay.ActionRecorder, records the moves of the members
         self.context = Context()
         self.context.retrive_pointX = retrive_pointX
         self.context.retrive_pointY = retrive_pointY
-        self.context.discovered_items = []
         self.context.robots = self.members
 
     def add_member(self, member : RobotCooperative):
@@ -22,10 +117,15 @@ class CooperativeTeam:
         Adds a member to the team.
         :param member: The cooperative robot to be added.
         """
-        member.gridX = len(self.grid)
-        member.gridY = len(self.grid[0])
+        member.gridX = self.grid.x
+        member.gridY = self.grid.y
         self.members.append(member)
         self.context.robots = self.members
+        member.occupancy = self.context.occupancy
+        member.registry = self.context.discovered_items
+        self.context.discovered_items.reserve(member.target)
+        self.context.discovered_items.reserve(member.item)
+        self.context.occupancy.add(member.x, member.y)
         return True
 
     def initMemory(self,x: int,y: int):
@@ -34,7 +134,9 @@ class CooperativeTeam:
         :param x: The number of rows in the grid.
         :param y: The number of columns in the grid.
         """
-        self.memory = [[0 for _ in range(y)] for _ in range(x)]
+        self.memory = Memory(x, y)
+        if self.exploration == "field":
+            self.context.exploration = ExplorationField(self.memory)
         for robot in self.context.robots:
             robot.updateMemory(self.grid, self.memory, self.context)
             robot.get_target(self.context)
@@ -42,17 +144,73 @@ class CooperativeTeam:
     def getMemory(self):
         return self.memory
 
+    def copy(self, grid: Grid) -> "CooperativeTeam":
+        """
+        Returns an independent copy of the team (memory, context and members) playing on the given grid
+        The copy is not recorded.
+        :param grid: grid of the copied game
+        """
+        other = CooperativeTeam.__new__(CooperativeTeam)
+        other.__dict__.update(self.__dict__)
+        other.grid = grid
+        other.recorder = None
+        if self.memory is not None:
+            other.memory = self.memory.copy()
+        other.context = self.context.copy()
+        if self.context.exploration is not None:
+            other.context.exploration = ExplorationField(other.memory)
+        other.members = [member.copy() for member in self.members]
+        for member in other.members:
+            member.occupancy = other.context.occupancy
+            member.registry = other.context.discovered_items
+        other.context.robots = other.members
+        return other
+
+    def decide(self) -> list:
+        """
+        Returns the actions of all members decided on the current state (first phase of a simultaneous turn)
+        """
+        if self.pool is None:
+            return decide_cooperative(self.members, self.grid, self.memory, self.context)
+        return self.pool.decide(decide_cooperative, self.members, self.grid, self.memory, self.context)
+
     def turn (self):
         """
         Executes a turn for each member of the team.
+        In simultaneous turns all actions are decided first, then the members carry them out in member order,
+        so the result does not depend on the pool.
+        With instrumentation enabled the turn and every robot move are timed.
         """
-        for member in self.members:
-            val = member.move(self.grid, self.memory, self.context)
+        stats = instrumentation.stats
+        if stats is not None:
+            turn_start = stats.clock()
+        if self.context.exploration is not None:
+            self.context.exploration.reset()
+        actions = None
+        if self.decisions == "simultaneous":
+            actions = self.decide()
+            if stats is not None:
+                stats.stop("cooperative_decisions", turn_start)
+        for i, member in enumerate(self.members):
+            if stats is not None:
+                start = stats.clock()
+            if self.recorder is not None:
+                x, y, score = member.x, member.y, self.context.score
+            if actions is None:
+                val = member.move(self.grid, self.memory, self.context)
+            else:
+                val = member.act(self.grid, self.memory, self.context, actions[i])
+            if self.recorder is not None:
+                self.recorder.record(member.x - x, member.y - y, val is not None, self.context.score != score)
             if val is not None:
                 x = val[0]
                 y = val[1]
                 #print("x, y", x, y)
-                self.grid[x][y] = Empty()
+                self.grid.set(x, y, EMPTY)
+            if stats is not None:
+                stats.stop("cooperative_robot_" + str(i), start)
+        if stats is not None:
+            stats.stop("cooperative_turn", turn_start)
 
     def getScore(self):
         return self.context.score
@@ -64,9 +222,18 @@ class SelfInterestedTeam:
     """
     This class represents a team of self-interested robots.
     """
-    def __init__(self, grid: list, retrive_pointX: int, retrive_pointY: int):
+    def __init__(self, grid: Grid, retrive_pointX: int, retrive_pointY: int, decisions: str = DECISIONS, pool: DecisionPool = None):
+        """
+        :param decisions: "sequential" or "simultaneous" (see CooperativeTeam)
+        :param pool: pool deciding the actions of simultaneous turns in parallel, None decides them in this thread
+        """
+        if decisions not in ("sequential", "simultaneous"):
+            raise ValueError("unknown decisions: " + decisions)
         self.members : list[RobotSelfInterested] = []
+        self.decisions = decisions
+        self.pool = pool
         self.grid = grid
+        self.recorder = None # src.replay.ActionRecorder, records the moves of the members
         self.context = Context()
         self.context.retrive_pointX = retrive_pointX
         self.context.retrive_pointY = retrive_pointY
@@ -75,23 +242,68 @@ class SelfInterestedTeam:
         Adds a member to the team.
         :param member: The self-interested robot to be added.
         """
-        member.gridX = len(self.grid)
-        member.gridY = len(self.grid[0])
+        member.gridX = self.grid.x
+        member.gridY = self.grid.y
         member.initMemory(self.grid)
         self.members.append(member)
         return True
 
+    def decide(self) -> list:
+        """
+        Returns the actions of all members decided on the current state (first phase of a simultaneous turn)
+        """
+        if self.pool is None:
+            return decide_self_interested(self.members, self.grid, self.context)
+        return self.pool.decide(decide_self_interested, self.members, self.grid, self.context)
+
     def turn (self):
         """
         Executes a turn for each member of the team.
+        In simultaneous turns all actions are decided first, then the members carry them out in member order.
+        With instrumentation enabled the turn and every robot move are timed.
         """
-        for member in self.members:
-            val = member.move(self.grid, self.context)
+        stats = instrumentation.stats
+        if stats is not None:
+            turn_start = stats.clock()
+        actions = None
+        if self.decisions == "simultaneous":
+            actions = self.decide()
+            if stats is not None:
+                stats.stop("self_interested_decisions", turn_start)
+        for i, member in enumerate(self.members):
+            if stats is not None:
+                start = stats.clock()
+            if self.recorder is not None:
+                x, y, score = member.x, member.y, self.context.score
+            if actions is None:
+                val = member.move(self.grid, self.context)
+            else:
+                val = member.act(self.grid, self.context, actions[i])
+            if self.recorder is not None:
+                self.recorder.record(member.x - x, member.y - y, val is not None, self.context.score != score)
             if val is not None:
                 x = val[0]
                 y = val[1]
-                self.grid[x][y] = Empty()
+                self.grid.set(x, y, EMPTY)
+            if stats is not None:
+                stats.stop("self_interested_robot_" + str(i), start)
+        if stats is not None:
+            stats.stop("self_interested_turn", turn_start)
 
 
     def getScore(self):
         return self.context.score
+
+    def copy(self, grid: Grid) -> "SelfInterestedTeam":
+        """
+        Returns an independent copy of the team (context and members with their memories) playing on the given grid
+        The copy is not recorded.
+        :param grid: grid of the copied game
+        """
+        other = SelfInterestedTeam.__new__(SelfInterestedTeam)
+        other.__dict__.update(self.__dict__)
+        other.grid = grid
+        other.recorder = None
+        other.context = self.context.copy()
+        other.members = [member.copy() for member in self.members]
+        return other
@@ -0,0 +1,180 @@
+"""
+Parameter sweep.
+
+Plays a number of seeded games for every combination of the given parameters (maze size, item count,
+robot count, wall density, generator, exploration of the cooperative team) and prints the win rates
+of both teams per combination.
+The parameters are passed to Game directly, util/consts.py only provides the defaults:
+
+    python sweep.py --density 1.2 1.5 2.0 --robots 4 6 8 --runs 100 --seed 1 --workers 4
+
+Every finished game (configuration x seed) is cached as a small JSON file named by the hash of the configuration
+and the seed, so running a sweep again only plays the games of new or changed configurations
+(or more seeds when --runs grows). The game seeds are derived from the master seed the same way as for
+main.py --run, so a sweep over the default configuration plays the same games as a run with the same seed.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from src.game import Game
+from src.generators import GENERATORS
+from src.results import game_record, new_tally, add_result
+from src.run_modes import derive_seed, play_chunks
+from util.consts import MAZE_X, MAZE_Y, ITEM_COUNT, ROBOT_COUNT, DENSITY_COEFFICIENT, GENERATOR, EXPLORATION
+
+# bump when a change of the game rules makes cached results invalid
+CACHE_VERSION = 1
+PARAMETERS = ("x", "y", "itemCount", "robotCount", "density", "generator", "exploration")
+
+
+def config_grid(values: dict) -> list:
+    """
+    Returns every combination of the parameter values as a configuration (dict with PARAMETERS keys)
+    :param values: list of values of every parameter
+    """
+    return [dict(zip(PARAMETERS, combination)) for combination in itertools.product(*(values[name] for name in PARAMETERS))]
+
+def cell_key(config: dict, seed: int) -> str:
+    """
+    Returns the content hash of a configuration and game seed, the name of its cache entry
+    The perfect mazes do not use the density, so for them configurations that only differ by it share their entries.
+    """
+    if config["generator"] != "density":
+        config = dict(config, density=None)
+    content = json.dumps({"version": CACHE_VERSION, "config": config, "seed": seed}, sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+def cache_path(cache: str, key: str) -> str:
+    # two-level layout, so no directory gets too many files
+    return os.path.join(cache, key[:2], key + ".json")
+
+def load_cell(cache: str, key: str) -> dict:
+    """
+    Returns the cached record of a cell, None if it was not played yet
+    """
+    try:
+        with open(cache_path(cache, key)) as file:
+            return json.load(file)["record"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+def store_cell(cache: str, key: str, config: dict, record: dict):
+    """
+    Writes the record of a cell to the cache, atomically, so an interrupted sweep never leaves a broken entry
+    """
+    path = cache_path(cache, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + ".%d.tmp" % os.getpid()
+    with open(temporary, "w") as file:
+        json.dump({"config": config, "record": record}, file)
+    os.replace(temporary, path)
+
+def play_cells(master_seed: int, cells: list, configs: list) -> list:
+    """
+    Plays the games of one chunk and returns (configuration index, record) pairs
+    :param master_seed: master seed, game i of every configuration uses derive_seed(master_seed, i)
+    :param cells: (configuration index, game index) pairs of the games
+    :param configs: configurations of the sweep
+    """
+    records = []
+    for c, index in cells:
+        config = configs[c]
+        seed = derive_seed(master_seed, index)
+        start = time.perf_counter()
+        game = Game(random.Random(seed), config["x"], config["y"], config["itemCount"], config["robotCount"],
+                    generator=config["generator"], density=config["density"], exploration=config["exploration"])
+        game.play()
+        records.append((c, game_record(index, seed, game.team1.getScore(), game.team2.getScore(), game.turns, time.perf_counter() - start)))
+    return records
+
+def sweep(configs: list, runs: int, seed: int, workers: int = 1, cache: str = ".sweep") -> list:
+    """
+    Plays runs games of every configuration (taking finished ones from the cache) and returns the tally of every configuration
+    Configurations with the same cache entry (see cell_key) play the game once.
+    :param configs: configurations to play
+    :param runs: number of games per configuration
+    :param seed: master seed, game i of every configuration uses derive_seed(seed, i)
+    :param workers: number of worker processes, 1 plays all games in this process
+    :param cache: directory of the result cache
+    """
+    tallies = [new_tally() for _ in configs]
+    # cache key of every game to play -> indices of the configurations that share it
+    missing = {}
+    cells = []
+    cached = 0
+    for c, config in enumerate(configs):
+        for index in range(runs):
+            key = cell_key(config, derive_seed(seed, index))
+            if key in missing:
+                missing[key].append(c)
+                continue
+            record = load_cell(cache, key)
+            if record is None:
+                missing[key] = [c]
+                cells.append((c, index))
+            else:
+                cached += 1
+                add_result(tallies[c], record["team1Score"], record["team2Score"], record["turns"])
+    print("Cached games: %d, games to play: %d" % (cached, len(cells)), file=sys.stderr)
+    # a few chunks per worker to even out long games
+    size = max(1, len(cells) // (max(1, workers) * 4))
+    chunks = [cells[start:start + size] for start in range(0, len(cells), size)]
+    for part in play_chunks(play_cells, seed, chunks, [configs], workers):
+        for c, record in part:
+            key = cell_key(configs[c], record["seed"])
+            store_cell(cache, key, configs[c], record)
+            for shared in missing[key]:
+                add_result(tallies[shared], record["team1Score"], record["team2Score"], record["turns"])
+    return tallies
+
+def print_report(configs: list, tallies: list, runs: int):
+    """
+    Prints a table with the parameters that differ between configurations and the results of every configuration
+    """
+    varying = [name for name in PARAMETERS if len({config[name] for config in configs}) > 1] or ["density"]
+    header = varying + ["team1 win %", "team2 win %", "draw %", "team1 score", "team2 score", "turns"]
+    print("".join("%-14s" % name for name in header))
+    for config, tally in zip(configs, tallies):
+        values = [config[name] for name in varying]
+        values += ["%.1f" % (100 * tally[name] / runs) for name in ("team1Win", "team2Win", "draw")]
+        values += ["%.2f" % (tally[name] / runs) for name in ("team1Score", "team2Score", "totalTurns")]
+        print("".join("%-14s" % value for value in values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Win rates over a grid of game parameters")
+    parser.add_argument("--x", type=int, nargs="+", default=[MAZE_X], help="maze widths")
+    parser.add_argument("--y", type=int, nargs="+", default=[MAZE_Y], help="maze heights")
+    parser.add_argument("--items", type=int, nargs="+", default=[ITEM_COUNT], help="item counts")
+    parser.add_argument("--robots", type=int, nargs="+", default=[ROBOT_COUNT], help="robot counts (both teams together)")
+    parser.add_argument("--density", type=float, nargs="+", default=[DENSITY_COEFFICIENT], help="wall densities")
+    parser.add_argument("--generator", choices=sorted(GENERATORS), nargs="+", default=[GENERATOR], help="maze generators")
+    parser.add_argument("--exploration", choices=["nearest", "field"], nargs="+", default=[EXPLORATION], help="explorations of the cooperative team")
+    parser.add_argument("--runs", type=int, default=100, help="games per configuration")
+    parser.add_argument("--seed", type=int, default=0, help="master seed of the games")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--cache", default=".sweep", help="directory of the result cache")
+    parser.add_argument("--output", help="write the configurations and their tallies as JSON")
+    args = parser.parse_args()
+    if any(robots % 2 for robots in args.robots):
+        parser.error("--robots values must be even, both teams get half of the robots")
+
+    configs = config_grid({
+        "x": args.x, "y": args.y, "itemCount": args.items, "robotCount": args.robots,
+        "density": args.density, "generator": args.generator, "exploration": args.exploration,
+    })
+    tallies = sweep(configs, args.runs, args.seed, args.workers, args.cache)
+    print_report(configs, tallies, args.runs)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"runs": args.runs, "seed": args.seed, "results": [
+                {"config": config, "tally": tally} for config, tally in zip(configs, tallies)
+            ]}, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -5,3 +5,6 @@ MAZE_Y = 23
 ITEM_COUNT = 6
 ROBOT_COUNT = 6
 AUTOMOVE_DELAY = 0.1
+GENERATOR = "density" # maze generator, see src/generators.py
+EXPLORATION = "nearest" # exploration of the cooperative team: "nearest" (every robot searches its closest unknown cell) or "field" (shared flow field)
+DECISIONS = "sequential" # team turns: "sequential" (every robot decides and moves in turn) or "simultaneous" (all robots decide on the state before the turn, then move)
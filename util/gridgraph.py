@@ -0,0 +1,280 @@
+import threading
+from array import array
+
+
+class GridGraph:
+    """
+    4-neighbour graph of an x by y grid on flat cell indices (index = x * y_size + y).
+    Holds the neighbour tables and preallocated search buffers that are reused by every search.
+    The visited buffer is cleared in O(1) by bumping the generation stamp.
+    expanded is the number of cells taken from the queue by the last search.
+    """
+    def __init__(self, x: int, y: int):
+        self.x = x
+        self.y = y
+        self.size = x * y
+        # neighbour offsets in the order (-1, 0), (1, 0), (0, -1), (0, 1), one tuple per kind of border cell
+        self.offsets = []
+        self.kind = bytearray(self.size)
+        for left in (False, True):
+            for right in (False, True):
+                for top in (False, True):
+                    for bottom in (False, True):
+                        offsets = []
+                        if not left:
+                            offsets.append(-y)
+                        if not right:
+                            offsets.append(y)
+                        if not top:
+                            offsets.append(-1)
+                        if not bottom:
+                            offsets.append(1)
+                        self.offsets.append(tuple(offsets))
+        for cx in range(x):
+            for cy in range(y):
+                self.kind[cx * y + cy] = (cx == 0) * 8 + (cx == x - 1) * 4 + (cy == 0) * 2 + (cy == y - 1)
+        self.stamp = array('I', bytes(4 * self.size))
+        self.generation = 0
+        self.dist = array('i', bytes(4 * self.size))
+        self.queue = array('i', bytes(4 * self.size))
+        self.unreached = array('i', [-1]) * self.size
+        # second label of estimate_length, allocated on first use
+        self.stamp2 = None
+        self.dist2 = None
+        self.expanded = 0
+
+    def next_generation(self) -> int:
+        """
+        Starts a new search, every cell becomes unvisited.
+        """
+        self.generation += 1
+        if self.generation == 2**32:
+            self.stamp = array('I', bytes(4 * self.size))
+            if self.stamp2 is not None:
+                self.stamp2 = array('I', bytes(4 * self.size))
+            self.generation = 1
+        return self.generation
+
+    def multi_source_field(self, cells: bytearray, passable: tuple, sources) -> array:
+        """
+        Returns the BFS distance from every cell to the nearest source (-1 for unreached cells).
+        Sources are not entered from other cells, every other cell entered must be passable by the passable lookup table.
+        :param cells: cell codes of the grid
+        :param passable: lookup table indexed by cell code
+        :param sources: flat indices of the sources
+        """
+        field = array('i', self.unreached)
+        offsets = self.offsets
+        kind = self.kind
+        queue = self.queue
+        tail = 0
+        for source in sources:
+            field[source] = 0
+            queue[tail] = source
+            tail += 1
+        head = 0
+        while head < tail:
+            current = queue[head]
+            head += 1
+            next_distance = field[current] + 1
+            for offset in offsets[kind[current]]:
+                index = current + offset
+                if field[index] == -1 and passable[cells[index]]:
+                    field[index] = next_distance
+                    queue[tail] = index
+                    tail += 1
+        self.expanded = head
+        return field
+
+    def estimate_length(self, cells: bytearray, known: tuple, unknown: tuple, start: int, goal: int) -> tuple:
+        """
+        Returns (length, True) for the shortest path from start to goal through known cells,
+        or (length, False) for the shortest path that may also go through unknown cells if there is no known one,
+        or (-1, False) if goal can not be reached at all.
+        Both lengths come from one A* search with the Manhattan distance to goal as heuristic over cells with two labels:
+        reached through known cells only (known lookup table) or through at least one unknown cell (unknown lookup table).
+        A cell reached with the first label at no greater cost makes the second label of the cell redundant.
+        Costs grow by 1 per step and f = cost + heuristic grows by 0 or 2, so the open list is two stacks (f and f + 2).
+        The search stops as soon as the answer is certain: at the goal with the first label, or at the goal with the second
+        label when no known path can exist or no state with the first label is left.
+        :param cells: cell codes of the grid
+        :param known: lookup table of cells passable with the first label
+        :param unknown: lookup table of cells passable with the second label (a superset of known)
+        :param start: flat index of the start
+        :param goal: flat index of the goal
+        """
+        self.expanded = 0
+        if start == goal:
+            return 0, True
+        if not unknown[cells[goal]]:
+            return -1, False
+        if self.stamp2 is None:
+            self.stamp2 = array('I', bytes(4 * self.size))
+            self.dist2 = array('i', bytes(4 * self.size))
+        generation = self.next_generation()
+        # label 0 (known cells only) in stamp / dist, label 1 in stamp2 / dist2
+        stamp = self.stamp
+        stamp2 = self.stamp2
+        dist = self.dist
+        dist2 = self.dist2
+        offsets = self.offsets
+        kind = self.kind
+        size_y = self.y
+        goal_x, goal_y = divmod(goal, size_y)
+        known_possible = known[cells[goal]]
+        found_unknown = -1
+        x, y = divmod(start, size_y)
+        f = abs(x - goal_x) + abs(y - goal_y)
+        stamp[start] = generation
+        dist[start] = 0
+        # states are index * 2 + label
+        current = [start * 2]
+        following = []
+        expanded = 0
+        while current or following:
+            if not current:
+                current, following = following, current
+                f += 2
+            state = current.pop()
+            index = state >> 1
+            label = state & 1
+            x, y = divmod(index, size_y)
+            g = f - abs(x - goal_x) - abs(y - goal_y)
+            if label:
+                # stale, redundant, or no longer needed
+                if dist2[index] != g or found_unknown != -1 or (stamp[index] == generation and dist[index] <= g):
+                    continue
+            elif dist[index] != g:
+                continue
+            if index == goal:
+                if not label:
+                    self.expanded = expanded
+                    return g, True
+                found_unknown = g
+                if not known_possible:
+                    break
+                continue
+            expanded += 1
+            g += 1
+            for offset in offsets[kind[index]]:
+                neighbor = index + offset
+                code = cells[neighbor]
+                if known[code]:
+                    next_label = label
+                elif unknown[code]:
+                    next_label = 1
+                else:
+                    continue
+                if next_label:
+                    if found_unknown != -1 or (stamp[neighbor] == generation and dist[neighbor] <= g):
+                        continue
+                    if stamp2[neighbor] == generation and dist2[neighbor] <= g:
+                        continue
+                    stamp2[neighbor] = generation
+                    dist2[neighbor] = g
+                else:
+                    if stamp[neighbor] == generation and dist[neighbor] <= g:
+                        continue
+                    stamp[neighbor] = generation
+                    dist[neighbor] = g
+                nx, ny = divmod(neighbor, size_y)
+                # moving towards the goal keeps f, moving away adds 2
+                if abs(nx - goal_x) + abs(ny - goal_y) < abs(x - goal_x) + abs(y - goal_y):
+                    current.append(neighbor * 2 + next_label)
+                else:
+                    following.append(neighbor * 2 + next_label)
+        self.expanded = expanded
+        return found_unknown, False
+
+    def first_reached(self, cells: bytearray, passable: tuple, start: int, code: int) -> int:
+        """
+        Returns the flat index of the first cell with the given code found by a BFS from start or -1.
+        The search goes through cells passable by the passable lookup table and does not expand the found cell.
+        :param cells: cell codes of the grid
+        :param passable: lookup table indexed by cell code
+        :param start: flat index of the start
+        :param code: cell code to look for
+        """
+        self.expanded = 0
+        if cells[start] == code:
+            return start
+        generation = self.next_generation()
+        stamp = self.stamp
+        offsets = self.offsets
+        kind = self.kind
+        queue = self.queue
+        stamp[start] = generation
+        queue[0] = start
+        head = 0
+        tail = 1
+        while head < tail:
+            current = queue[head]
+            head += 1
+            for offset in offsets[kind[current]]:
+                index = current + offset
+                if stamp[index] != generation:
+                    value = cells[index]
+                    if value == code:
+                        self.expanded = head
+                        return index
+                    if passable[value]:
+                        stamp[index] = generation
+                        queue[tail] = index
+                        tail += 1
+        self.expanded = head
+        return -1
+
+    def first_source_reached(self, field: array, start: int) -> int:
+        """
+        Returns the flat index of the first source of a multi_source_field found by a BFS from start or -1.
+        Only cells one step closer to a source are entered, so the search stays on the shortest paths from start
+        to its closest sources. Those cells are queued in the same order as by a plain BFS, so the result is the cell
+        first_reached returns when the sources are the cells with its code next to passable cells.
+        :param field: multi_source_field of the grid
+        :param start: flat index of the start, a cell entered by the field (or a source)
+        """
+        self.expanded = 0
+        if field[start] <= 0:
+            return start if field[start] == 0 else -1
+        generation = self.next_generation()
+        stamp = self.stamp
+        offsets = self.offsets
+        kind = self.kind
+        queue = self.queue
+        stamp[start] = generation
+        queue[0] = start
+        head = 0
+        tail = 1
+        while head < tail:
+            current = queue[head]
+            head += 1
+            closer = field[current] - 1
+            for offset in offsets[kind[current]]:
+                index = current + offset
+                if field[index] == closer and stamp[index] != generation:
+                    if closer == 0:
+                        self.expanded = head
+                        return index
+                    stamp[index] = generation
+                    queue[tail] = index
+                    tail += 1
+        self.expanded = head
+        return -1
+
+
+# graphs of every thread, the search buffers of a graph can only be used by one search at a time
+_local = threading.local()
+
+
+def grid_graph(x: int, y: int) -> GridGraph:
+    """
+    Returns the shared graph of an x by y grid of the calling thread, it is built on first use.
+    """
+    graphs = getattr(_local, "graphs", None)
+    if graphs is None:
+        graphs = _local.graphs = {}
+    graph = graphs.get((x, y))
+    if graph is None:
+        graph = GridGraph(x, y)
+        graphs[(x, y)] = graph
+    return graph
@@ -1,6 +1,11 @@
-from src.objects import Wall, Empty, Item
+from src.objects import EMPTY, WALL, PATH, KNOWN_PASSABLE, UNKNOWN_PASSABLE, UNKNOWN
+from src.grid import Grid, Memory
+from util.gridgraph import grid_graph
+from array import array
 from util.consts import DENSITY_COEFFICIENT
+from util import instrumentation
 import random
+import threading
 
 def distance(x1: int, y1: int, x2:int, y2: int) -> int:
     """
@@ -8,186 +13,170 @@ def distance(x1: int, y1: int, x2:int, y2: int) -> int:
     """
     return abs(x1 - x2) + abs(y1 - y2)
 
+# guards the caches of memories and exploration fields, threads of a DecisionPool share them while they decide
+cache_lock = threading.Lock()
 
 
-def BFSFindZero(memory: list, x: int, y: int):
+
+def BFSFindZero(memory: Memory, x: int, y: int):
     """
     Finds closest zero in the memory
-    :param memory: 2D list representing the memory
+    Only the frontier (unknown cells next to known passable cells) can be the closest zero.
+    Once the plain searches from the robots cost as much as the distance field of the frontier would
+    (while the memory did not change), the field is computed and cached in the memory. With the field, the search only
+    follows the shortest paths to the closest zeros (same zero as the plain search) and returns at once if none can be reached.
+    :param memory: memory of the robot or team
     :param x: starting x coordinate
     :param y: starting y coordinate
     :return: coordinates of the closest zero in the memory or None if not found
     """
-    queue = [(x, y)]
-    visited = set()
-    visited.add((x, y))
-    while queue:
-        current_x, current_y = queue.pop(0)
-        if memory[current_x][current_y] == 0:
-            return current_x, current_y
-        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            new_x = current_x + dx
-            new_y = current_y + dy
-            if 0 <= new_x < len(memory) and 0 <= new_y < len(memory[0]) and (new_x, new_y) not in visited and not isinstance(memory[new_x][new_y], Wall):
-                queue.append((new_x, new_y))
-                visited.add((new_x, new_y))
-    return None
-
-def BFSShortestPathToItem(memory: list, x: int, y: int, itemX: int, itemY: int, known=True) -> int:
-    """
-    Returns length of the shortest path to the item
-    :param memory: 2D list representing the memory
-    :param x: starting x coordinate
-    :param y: starting y coordinate
-    :param itemX: x coordinate of the item
-    :param itemY: y coordinate of the item
-    :param known: if True, only guaranteed paths are considered
-    """
-    queue = [(x, y, 0)]  # (x, y, distance)
-    visited = set()
-    visited.add((x, y))
-    while queue:
-        current_x, current_y, distance = queue.pop(0)
-        if isinstance(memory[current_x][current_y], Wall):
-            continue
-        if current_x == itemX and current_y == itemY:
-            return distance
-        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            new_x = current_x + dx
-            new_y = current_y + dy
-            if 0 <= new_x < len(memory) and 0 <= new_y < len(memory[0]) and (new_x, new_y) not in visited and (validate_known_path(memory[new_x][new_y]) if known else validate_unknown_path(memory[new_x][new_y])):
-                queue.append((new_x, new_y, distance + 1))
-                visited.add((new_x, new_y))
-    return -1
-
-
-def validate_known_path(obj) -> bool:
-    """
-    checks if the object is a wall or empty space
-    """
-    if isinstance(obj, Empty) or isinstance(obj, Item):
-        return True
-    return False
-
-def validate_unknown_path(obj) -> bool:
-    """
-    checks if the object is a wall, empty space or 0 (=unknown)
-    """
-    if isinstance(obj, Empty) or isinstance(obj, Item) or obj == 0:
-        return True
-    return False
-
-def optimalPathEstimate(memory: list, x: int, y: int, itemX: int, itemY: int) -> int:
-    """
-    Returns estimate of the optimal path length to the item based on the density of the walls
-    :param memory: 2D list representing the memory
+    start = x * memory.y + y
+    passable = KNOWN_PASSABLE[memory.cells[start]]
+    if passable and not memory.frontier:
+        return None
+    graph = grid_graph(memory.x, memory.y)
+    with cache_lock:
+        if memory.frontier_field_version != memory.version:
+            memory.frontier_field = None
+            memory.frontier_field_version = memory.version
+            memory.frontier_search_work = 0
+        if passable and memory.frontier_field is None and memory.frontier_search_work >= memory.known:
+            memory.frontier_field = BFSExplorationField(memory)
+        field = memory.frontier_field
+    if passable and field is not None:
+        found = graph.first_source_reached(field, start)
+    else:
+        # the first zero queued is the first one a plain BFS would pop
+        found = graph.first_reached(memory.cells, KNOWN_PASSABLE, start, UNKNOWN)
+        with cache_lock:
+            memory.frontier_search_work += graph.expanded
+    if instrumentation.stats is not None:
+        instrumentation.stats.count_bfs(graph.expanded)
+    if found == -1:
+        return None
+    return divmod(found, memory.y)
+
+def BFSExplorationField(memory: Memory) -> array:
+    """
+    Returns the distance from every cell to the closest zero (unknown cell) through known passable cells,
+    indexed by flat cell index, -1 for cells that can not reach any zero
+    A multi-source BFS from the frontier, the only zeros reachable that way (see BFSFindZero)
+    :param memory: memory of the robot or team
+    """
+    graph = grid_graph(memory.x, memory.y)
+    field = graph.multi_source_field(memory.cells, KNOWN_PASSABLE, memory.frontier)
+    if instrumentation.stats is not None:
+        instrumentation.stats.count_bfs(graph.expanded)
+    return field
+
+def optimalPathEstimate(memory: Grid, x: int, y: int, itemX: int, itemY: int) -> int:
+    """
+    Returns estimate of the optimal path length to the item or None if the item can not be reached
+    The estimate is the length of the shortest path through known cells if known * DENSITY_COEFFICIENT is greater than
+    the length of the shortest path that may go through unknown cells, otherwise the latter.
+    With DENSITY_COEFFICIENT >= 1 that is the known length whenever there is one, which a single goal-directed search
+    (GridGraph.estimate_length) finds without the unknown length, so the second search only runs for smaller coefficients.
+    :param memory: grid representing the memory
     :param x: starting x coordinate
     :param y: starting y coordinate
     :param itemX: x coordinate of the item
     :param itemY: y coordinate of the item
     """
-    known = BFSShortestPathToItem(memory, x, y, itemX, itemY, known=True)
-    unknown = BFSShortestPathToItem(memory, x, y, itemX, itemY, known=False)
-    if known * DENSITY_COEFFICIENT > unknown:
-        return known
-    return unknown
-
-class Node:
-    """
-    Node class for DFS-based pathfinding
-    """
-    def __init__(self, x, y, prev):
-        self.x = x
-        self.y = y
-        self.prev = prev
-
-def getRandomPath(one: tuple, two: tuple, grid: list):
-    """
-    DFS-based algorithm to get a random path between two points
-    sets elements on the path to 1
-    adds neighbors to stack in random order favoring neighbors closer to the target
-    :param one: starting point
-    :param two: target point
-    :param grid: 2D list representing the grid
-    """
-    grid[one[0]][one[1]] = 1
-    grid[two[0]][two[1]] = 1
-    # DFS with random choice
-    stack = [Node(one[0], one[1], None)]
-    visited = set()
-    visited.add(one)
-    current = one
-    while stack:
-        current = stack.pop()
-        if current.x == two[0] and current.y == two[1]:
-            # reconstruct path
-            while current.prev is not None:
-                grid[current.x][current.y] = 1
-                current = current.prev
+    start = x * memory.y + y
+    if memory.cells[start] == WALL:
+        return None
+    graph = grid_graph(memory.x, memory.y)
+    goal = itemX * memory.y + itemY
+    length, known = graph.estimate_length(memory.cells, KNOWN_PASSABLE, UNKNOWN_PASSABLE, start, goal)
+    if instrumentation.stats is not None:
+        instrumentation.stats.count_bfs(graph.expanded)
+    if length == -1:
+        return None
+    if known and DENSITY_COEFFICIENT < 1:
+        # shortest path over all passable cells, known or not
+        unknown, _ = graph.estimate_length(memory.cells, UNKNOWN_PASSABLE, UNKNOWN_PASSABLE, start, goal)
+        if instrumentation.stats is not None:
+            instrumentation.stats.count_bfs(graph.expanded)
+        if length * DENSITY_COEFFICIENT <= unknown:
+            return unknown
+    return length
+
+def carveRandomPath(grid: Grid, start: int, target: int, connected: set, rng=random):
+    """
+    Carves a random shortest path from start towards target, empty cells on the path are set to PATH
+    Steps along x and y are interleaved at random (every monotone path is equally likely)
+    The walk stops at the first cell that is already connected (a PATH cell or a cell in connected),
+    so over all calls every cell is carved at most once
+    :param grid: grid to carve the path in
+    :param start: flat index of the starting point
+    :param target: flat index of the target point, it must be connected
+    :param connected: flat indices of connected cells that are not marked as PATH (e.g. items)
+    :param rng: random number generator to use
+    """
+    cells = grid.cells
+    if cells[start] == PATH:
+        return
+    if cells[start] == EMPTY:
+        cells[start] = PATH
+    x0, y0 = divmod(start, grid.y)
+    x1, y1 = divmod(target, grid.y)
+    stepX = grid.y if x1 > x0 else -grid.y
+    stepY = 1 if y1 > y0 else -1
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    current = start
+    rand = rng.random
+    while dx or dy:
+        if rand() * (dx + dy) < dx:
+            current += stepX
+            dx -= 1
+        else:
+            current += stepY
+            dy -= 1
+        code = cells[current]
+        if code == PATH or current in connected:
             return
-        x, y = current.x, current.y
-        neighbors = [(x + dx, y + dy) for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]]
-
-        #print("neighbors", neighbors)
-        neighbors = shuffleNeighbors(current, neighbors, two, grid)
-        for neighbor in neighbors:
-            nx, ny = neighbor
-            if 0 <= nx < len(grid) and 0 <= ny < len(grid[0]) and neighbor not in visited:
-                stack.append(Node(nx, ny, current))
-                visited.add(neighbor)
-
-
-def shuffleNeighbors(current: Node, neighbors: list, target: tuple, grid: list) -> list:
-    """
-    sorts neighbors of a location in random order
-    uses weighted rulette to choose order of neighbors
-    closer to target weight = 15
-    else weight = 1
-    ensures "short" path but not necessarily the shortest
-    :param current: current node
-    :param neighbors: list of neighbors
-    :param target: target coordinates
-    :param grid: 2D list representing the grid
-    """
-    distances = []
-    current_distance = distance(current.x, current.y, target[0], target[1])
-    for neighbor in neighbors:
-        nx, ny = neighbor
-        if 0 <= nx < len(grid) and 0 <= ny < len(grid[0]):
-            neighbor_distance = distance(nx, ny, target[0], target[1])
-            if neighbor_distance < current_distance:
-                distances.append((neighbor, 15))
-            else:
-                distances.append((neighbor, 1))
-    # weighted rulette
-    total_weight = sum(weight for _, weight in distances)
-    if total_weight == 0:
-        return neighbors
-    weights = [weight / total_weight for _, weight in distances]
-    # sort by weight
-    sampled = random.choices([n for n, _ in distances], weights=weights, k=len(distances))
-    seen = set()
-    shuffled_neighbors = []
-    for n in sampled:
-        if n not in seen:
-            shuffled_neighbors.append(n)
-            seen.add(n)
-        if len(shuffled_neighbors) == len(distances):
-            break
-
-    return shuffled_neighbors
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+        if code == EMPTY:
+            cells[current] = PATH
+
+def replaceRandomCells(cells: bytearray, old: int, new: int, count: int, rng=random):
+    """
+    Sets count cells with the code old, chosen uniformly at random without replacement, to new
+    Every cell gets a random byte key, the cells with the smallest keys are replaced (ties are broken by sampling),
+    so apart from sampling the ties everything is done by a few bytes passes over the grid
+    :param cells: cell codes of the grid
+    :param old: code of the cells to choose from
+    :param new: code to set
+    :param count: number of cells to replace, at most the number of cells with the code old
+    :param rng: random number generator to use
+    """
+    size = len(cells)
+    free = cells.count(old)
+    if count > free:
+        raise ValueError("not enough cells to replace")
+    if count <= 0:
+        return
+    # cells with another code get the key 255 and are never taken unless their code is old
+    other = bytes(0 if code == old else 255 for code in range(256))
+    keys = (int.from_bytes(rng.randbytes(size), "little") | int.from_bytes(cells.translate(other), "little")).to_bytes(size, "little")
+    def below(threshold):
+        return keys.translate(bytes(code < threshold for code in range(256))).count(1)
+    threshold = min(255, count * 256 // free)
+    taken = below(threshold)
+    while taken > count:
+        threshold -= 1
+        taken = below(threshold)
+    while threshold < 255 and below(threshold + 1) <= count:
+        threshold += 1
+        taken = below(threshold)
+    mask = keys.translate(bytes(code < threshold for code in range(256)))
+    cells[:] = (int.from_bytes(cells, "little") + (new - old) * int.from_bytes(mask, "little")).to_bytes(size, "little")
+    ties = []
+    key = bytes([threshold])
+    i = keys.find(key)
+    while i != -1:
+        if cells[i] == old:
+            ties.append(i)
+        i = keys.find(key, i + 1)
+    for i in rng.sample(ties, count - taken):
+        cells[i] = new
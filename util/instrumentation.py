@@ -0,0 +1,106 @@
+"""
+Optional instrumentation of the simulation hot paths.
+
+Instrumentation is off by default: stats is None and every instrumented call site only checks
+`instrumentation.stats is not None`. enable() installs a Stats object that collects counters
+(BFS calls, expanded BFS nodes, utility calls, exploration fallbacks) and timers (team turns, robot moves).
+"""
+import json
+import threading
+import time
+
+COUNTERS = ("bfs_calls", "bfs_nodes_expanded", "utility_calls", "fallback_explorations")
+
+stats = None
+
+
+class Stats:
+    """
+    Counters and timers of one run.
+    A timer keeps the number of measurements, their total and the longest one (in seconds).
+    Counting and timing are guarded by a lock, the threads of a DecisionPool share the stats.
+    """
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.timers = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def clock() -> float:
+        return time.perf_counter()
+
+    def count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def count_bfs(self, expanded: int):
+        """
+        Counts one BFS that took expanded cells from its queue
+        """
+        with self.lock:
+            self.counters["bfs_calls"] += 1
+            self.counters["bfs_nodes_expanded"] += expanded
+
+    def stop(self, name: str, start: float):
+        """
+        Adds the time since start (a value returned by clock) to the timer
+        """
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [1, elapsed, elapsed]
+            else:
+                timer[0] += 1
+                timer[1] += elapsed
+                if elapsed > timer[2]:
+                    timer[2] = elapsed
+
+    def merge(self, other: dict):
+        """
+        Adds the stats exported by to_dict (e.g. from a worker process)
+        """
+        for name, value in other["counters"].items():
+            self.count(name, value)
+        for name, timer in other["timers"].items():
+            mine = self.timers.setdefault(name, [0, 0.0, 0.0])
+            mine[0] += timer["count"]
+            mine[1] += timer["total"]
+            mine[2] = max(mine[2], timer["max"])
+
+    def to_dict(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "timers": {
+                name: {"count": count, "total": total, "mean": total / count, "max": longest}
+                for name, (count, total, longest) in self.timers.items()
+            },
+        }
+
+    def export(self, path: str, **meta):
+        """
+        Writes the stats as JSON
+        :param path: file to write
+        :param meta: additional information about the run stored under "meta"
+        """
+        data = self.to_dict()
+        data["meta"] = meta
+        with open(path, "w") as file:
+            json.dump(data, file, indent=2)
+
+
+def enable() -> Stats:
+    """
+    Turns instrumentation on with fresh stats and returns them
+    """
+    global stats
+    stats = Stats()
+    return stats
+
+def disable() -> Stats:
+    """
+    Turns instrumentation off and returns the collected stats
+    """
+    global stats
+    collected, stats = stats, None
+    return collected
@@ -0,0 +1,57 @@
+from array import array
+from src.objects import WALL
+
+
+class UnionFind:
+    """
+    Disjoint sets of flat cell indices (union by size with path halving).
+    """
+    def __init__(self, size: int):
+        self.parent = array('i', range(size))
+        self.size = array('i', [1]) * size
+
+    def find(self, i: int) -> int:
+        """
+        Returns the representative of the set containing i
+        """
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> bool:
+        """
+        Joins the sets of a and b, returns False if they already were one set
+        """
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return False
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return True
+
+
+def open_components(cells: bytearray, x: int, y: int) -> UnionFind:
+    """
+    Joins every pair of neighbouring cells that are not walls in a single pass over the grid
+    Two cells are in the same set exactly when a robot can walk from one to the other
+    :param cells: cell codes of the grid (index = x * y_size + y)
+    :param x: width of the grid
+    :param y: height of the grid
+    """
+    sets = UnionFind(x * y)
+    union = sets.union
+    for index in range(x * y):
+        if cells[index] == WALL:
+            continue
+        # right and bottom neighbours, the other two were joined from their side
+        right = index + y
+        if right < x * y and cells[right] != WALL:
+            union(index, right)
+        if (index + 1) % y and cells[index + 1] != WALL:
+            union(index, index + 1)
+    return sets